@@ -2,6 +2,11 @@ import logging
 
 from fastapi import APIRouter
 
+from services.indicator_cache import indicator_cache
+from services.llm_cache import llm_cache
+from services.prescore import prescorer
+from services.signal_store import signal_store
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -13,3 +18,22 @@ def send_message_to_teregram():
 
     return {"message": "send message successful"}
 
+
+@router.get("/api/indicator_cache/stats")
+def indicator_cache_stats():
+    return indicator_cache.stats()
+
+
+@router.get("/api/llm_cache/stats")
+def llm_cache_stats():
+    return llm_cache.stats()
+
+
+@router.get("/api/prescore/stats")
+def prescore_stats():
+    return prescorer.stats()
+
+
+@router.get("/api/signal_store/stats")
+def signal_store_stats():
+    return signal_store.stats()
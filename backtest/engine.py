@@ -0,0 +1,302 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from candlestick import candlestick
+from services.indicators import calculate_rsi, detect_123_continuation_patterns, rsi_filter_flags
+from services.market.kline_store import KlineStore, kline_store
+
+logger = logging.getLogger(__name__)
+
+# 与 services.indicators 中 get_*_signal 一致：方向、止损取当根K线的 low/high、tp_mult=2
+CANDLE_RULES = {
+    "hammer": "long",
+    "inverted_hammer": "short",
+    "bullish_engulfing": "long",
+    "bearish_engulfing": "short",
+}
+# 与 get_123_signal 一致的参数
+RULE_123_PARAMS = {"tp_mult": 1.5, "length": 5, "use_close_for_entry": True, "min_signal_distance": 10}
+ALL_RULES = tuple(CANDLE_RULES) + ("123_breakout",)
+
+
+class FirstTouchIndex:
+    """
+    批量查询“从 start 开始第一根触及价位的K线”：
+    kind="max" 查找 values[j] >= level，kind="min" 查找 values[j] <= level。
+    数据按 block 根分块，块内直接比较，块间在块极值的稀疏表上二分跳跃，
+    内存 O(n)，每次查询 O(block + log n)，所有查询一次性向量化完成。
+    """
+
+    def __init__(self, values, kind="max", block=64):
+        self.n = len(values)
+        self.block = block
+        self.sign = 1.0 if kind == "max" else -1.0
+        padded_len = max(-(-self.n // block), 1) * block
+        self.padded = np.full(padded_len, -np.inf)
+        self.padded[:self.n] = np.asarray(values, dtype=float) * self.sign
+        self.blocks = self.padded.reshape(-1, block).max(axis=1)
+
+        self.table = [self.blocks]
+        k = 1
+        while (1 << k) <= len(self.blocks):
+            prev = self.table[-1]
+            half = 1 << (k - 1)
+            self.table.append(np.maximum(prev[:-half], prev[half:]))
+            k += 1
+
+    def _first_in_block(self, block_idx, levels, start=None):
+        offsets = np.arange(self.block)
+        idx = block_idx[:, None] * self.block + offsets
+        hit = self.padded[np.minimum(idx, len(self.padded) - 1)] >= levels[:, None]
+        if start is not None:
+            hit &= idx >= start[:, None]
+        found = hit.any(axis=1)
+        return np.where(found, block_idx * self.block + hit.argmax(axis=1), -1)
+
+    def find(self, starts, levels):
+        starts = np.asarray(starts, dtype=np.int64)
+        levels = np.asarray(levels, dtype=float) * self.sign
+        result = np.full(len(starts), -1, dtype=np.int64)
+        valid = starts < self.n
+        if not valid.any():
+            return result
+
+        s, lv = starts[valid], levels[valid]
+        block_count = len(self.blocks)
+
+        # 1. 起点所在的块
+        first = self._first_in_block(s // self.block, lv, start=s)
+
+        # 2. 之后的块：跳过块极值未触及价位的区间
+        pos = s // self.block + 1
+        for k in range(len(self.table) - 1, -1, -1):
+            span = 1 << k
+            can = pos + span - 1 < block_count
+            extreme = self.table[k][np.minimum(pos, len(self.table[k]) - 1)]
+            pos = pos + np.where(can & (extreme < lv), span, 0)
+        in_range = pos < block_count
+        later = np.full(len(s), -1, dtype=np.int64)
+        if in_range.any():
+            later[in_range] = self._first_in_block(pos[in_range], lv[in_range])
+
+        found = np.where(first >= 0, first, later)
+        found[found >= self.n] = -1
+        result[valid] = found
+        return result
+
+
+def _candle_signals(df: pd.DataFrame, rule: str, tp_mult: float = 2, pattern_params: dict = None) -> pd.DataFrame:
+    direction = CANDLE_RULES[rule]
+    cndl = candlestick.create_pattern(rule, **(pattern_params or {}))
+    cndl.prepare_values(*(df[column].to_numpy(dtype=float) for column in ("open", "high", "low", "close")))
+    idx = np.flatnonzero(cndl.evaluate(False)[0])
+    close = df["close"].to_numpy(dtype=float)[idx]
+    stop = (df["low"] if direction == "long" else df["high"]).to_numpy(dtype=float)[idx]
+    sign = 1 if direction == "long" else -1
+    return pd.DataFrame({
+        "index": idx,
+        "direction": direction,
+        "entry_price": close,
+        "stop_loss": stop,
+        "take_profit": close + sign * np.abs(close - stop) * tp_mult,
+    })
+
+
+def _123_signals(df: pd.DataFrame, params: dict) -> pd.DataFrame:
+    """
+    检测器的 entry_price 是被突破的前高/前低，但突破要等信号K线收盘才确认，此时价格可能已远离该价位，
+    因此按信号K线收盘价成交；收盘时已越过止盈或止损的信号无法再按原计划入场，直接丢弃
+    """
+    klines = df[["open_time", "open", "high", "low", "close", "volume"]].to_numpy(dtype=float).tolist()
+    patterns = detect_123_continuation_patterns(klines, show_plot=False, **params)
+    idx = np.array([p["index"] for p in patterns], dtype=np.int64)
+    is_long = np.array([p["type"] == "long" for p in patterns], dtype=bool)
+    stop = np.array([p["stop_loss"] for p in patterns], dtype=float)
+    target = np.array([p["take_profit"] for p in patterns], dtype=float)
+    close = df["close"].to_numpy(dtype=float)[idx]
+    tradable = np.where(is_long, (stop < close) & (close < target), (target < close) & (close < stop))
+    return pd.DataFrame({
+        "index": idx[tradable],
+        "direction": np.where(is_long, "long", "short")[tradable],
+        "entry_price": close[tradable],
+        "stop_loss": stop[tradable],
+        "take_profit": target[tradable],
+    })
+
+
+def _filter_by_rsi(signals: pd.DataFrame, rsi_values, long_band, short_band) -> pd.DataFrame:
+    long_flags, short_flags = rsi_filter_flags(rsi_values, long_band, short_band)
+    idx = signals["index"].to_numpy(dtype=np.int64)
+    is_long = (signals["direction"] == "long").to_numpy()
+    return signals[np.where(is_long, long_flags[idx], short_flags[idx])]
+
+
+def build_signals(df: pd.DataFrame, rule: str, params: dict = None, rsi_values=None) -> pd.DataFrame:
+    """
+    生成某条规则在整段K线上的全部信号，params 覆盖默认参数：
+    - tp_mult：止盈倍数（K线形态默认 2，123 默认 1.5）
+    - 123 规则：length / min_signal_distance / use_close_for_entry
+    - K线形态：其余键作为形态类的阈值参数（如 hammer 的 lower_shadow_ratio）
+    - rsi_long_band / rsi_short_band：给出任一项时，只保留信号K线 RSI 落在区间内且方向一致的信号
+    """
+    params = dict(params or {})
+    long_band = params.pop("rsi_long_band", None)
+    short_band = params.pop("rsi_short_band", None)
+
+    if rule == "123_breakout":
+        signals = _123_signals(df, {**RULE_123_PARAMS, **params})
+    elif rule in CANDLE_RULES:
+        tp_mult = params.pop("tp_mult", 2)
+        signals = _candle_signals(df, rule, tp_mult=tp_mult, pattern_params=params)
+    else:
+        raise ValueError(f"Unsupported rule: {rule}")
+
+    if long_band is not None or short_band is not None:
+        if rsi_values is None:
+            rsi_values = calculate_rsi(df).to_numpy(dtype=float)
+        signals = _filter_by_rsi(signals, rsi_values, long_band or (30, 50), short_band or (50, 70))
+    return signals
+
+
+def resolve_trades(df: pd.DataFrame, signals: pd.DataFrame, max_holding: int = None,
+                   high_index: FirstTouchIndex = None, low_index: FirstTouchIndex = None) -> pd.DataFrame:
+    """
+    从信号K线的下一根开始，查找止盈/止损谁先被触及：
+    - 同一根K线同时触及止盈和止损时按止损处理（保守）
+    - max_holding 根内（或到数据末尾）都未触及时记为 open，按最后一根收盘价计算浮动盈亏
+    返回带 outcome/exit_index/exit_price/pnl_r/pnl_pct 列的信号表
+    """
+    n = len(df)
+    high_index = high_index or FirstTouchIndex(df["high"].to_numpy(dtype=float), "max")
+    low_index = low_index or FirstTouchIndex(df["low"].to_numpy(dtype=float), "min")
+    close = df["close"].to_numpy(dtype=float)
+
+    trades = signals.copy()
+    entry = trades["entry_price"].to_numpy(dtype=float)
+    stop = trades["stop_loss"].to_numpy(dtype=float)
+    target = trades["take_profit"].to_numpy(dtype=float)
+    is_long = (trades["direction"] == "long").to_numpy()
+    risk = np.where(is_long, entry - stop, stop - entry)
+
+    # 风险为 0 或方向错误的信号无法计算 R 值，丢弃
+    keep = risk > 0
+    trades, entry, stop, target, is_long, risk = (trades[keep], entry[keep], stop[keep], target[keep],
+                                                  is_long[keep], risk[keep])
+    starts = trades["index"].to_numpy(dtype=np.int64) + 1
+
+    tp_idx = np.full(len(trades), -1, dtype=np.int64)
+    sl_idx = np.full(len(trades), -1, dtype=np.int64)
+    if is_long.any():
+        tp_idx[is_long] = high_index.find(starts[is_long], target[is_long])
+        sl_idx[is_long] = low_index.find(starts[is_long], stop[is_long])
+    if (~is_long).any():
+        tp_idx[~is_long] = low_index.find(starts[~is_long], target[~is_long])
+        sl_idx[~is_long] = high_index.find(starts[~is_long], stop[~is_long])
+
+    last_idx = np.full(len(trades), n - 1, dtype=np.int64)
+    if max_holding is not None:
+        last_idx = np.minimum(last_idx, starts + max_holding - 1)
+        tp_idx[tp_idx > last_idx] = -1
+        sl_idx[sl_idx > last_idx] = -1
+
+    win = (tp_idx >= 0) & ((sl_idx < 0) | (tp_idx < sl_idx))
+    loss = (sl_idx >= 0) & ~win
+    exit_idx = np.where(win, tp_idx, np.where(loss, sl_idx, np.minimum(last_idx, n - 1)))
+    exit_price = np.where(win, target, np.where(loss, stop, close[np.clip(exit_idx, 0, n - 1)]))
+
+    direction_sign = np.where(is_long, 1.0, -1.0)
+    trades["outcome"] = np.where(win, "win", np.where(loss, "loss", "open"))
+    trades["exit_index"] = exit_idx
+    trades["exit_price"] = exit_price
+    trades["pnl_r"] = direction_sign * (exit_price - entry) / risk
+    trades["pnl_pct"] = direction_sign * (exit_price - entry) / entry
+    return trades
+
+
+def summarize_trades(trades: pd.DataFrame) -> dict:
+    """
+    统计已平仓交易：胜率、期望（R）、平均收益率、最大回撤（按入场顺序累计 R）
+    """
+    closed = trades[trades["outcome"] != "open"].sort_values("index", kind="stable")
+    pnl_r = closed["pnl_r"].to_numpy()
+    equity = np.cumsum(pnl_r)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity if len(equity) else np.zeros(0)
+    wins = int((closed["outcome"] == "win").sum())
+    return {
+        "trades": int(len(closed)),
+        "wins": wins,
+        "losses": int(len(closed) - wins),
+        "open": int((trades["outcome"] == "open").sum()),
+        "win_rate": round(wins / len(closed), 4) if len(closed) else 0.0,
+        "expectancy_r": round(float(pnl_r.mean()), 4) if len(pnl_r) else 0.0,
+        "avg_pnl_pct": round(float(closed["pnl_pct"].mean()), 6) if len(closed) else 0.0,
+        "total_r": round(float(equity[-1]), 4) if len(equity) else 0.0,
+        "max_drawdown_r": round(float(drawdown.max()), 4) if len(drawdown) else 0.0,
+    }
+
+
+def evaluate_rule(df: pd.DataFrame, rule: str, params: dict = None, max_holding: int = None,
+                  high_index: FirstTouchIndex = None, low_index: FirstTouchIndex = None, rsi_values=None) -> dict:
+    """
+    回测单条规则（一组参数），返回统计结果；同一段K线多次评估时可传入预先构建的索引和 RSI
+    """
+    signals = build_signals(df, rule, params, rsi_values=rsi_values)
+    trades = resolve_trades(df, signals, max_holding=max_holding, high_index=high_index, low_index=low_index)
+    return summarize_trades(trades)
+
+
+def backtest_frame(df: pd.DataFrame, rules=ALL_RULES, max_holding: int = None, params: dict = None) -> dict:
+    """
+    在一段K线（列 open_time/open/high/low/close/volume）上回测指定规则，返回 {rule: 统计结果}；
+    params 为 {rule: 参数}，未给出的规则使用默认参数
+    """
+    df = df.reset_index(drop=True)
+    high_index = FirstTouchIndex(df["high"].to_numpy(dtype=float), "max")
+    low_index = FirstTouchIndex(df["low"].to_numpy(dtype=float), "min")
+    params = params or {}
+    return {
+        rule: evaluate_rule(df, rule, params.get(rule), max_holding, high_index, low_index)
+        for rule in rules
+    }
+
+
+def run_backtest(market: str, symbol: str, interval: str, rules=ALL_RULES, max_holding: int = None,
+                 store: KlineStore = kline_store) -> dict:
+    """
+    用本地K线存储中的全部历史回测单个交易对
+    """
+    df = store.read(market, symbol, interval)
+    return {
+        "market": market,
+        "symbol": symbol,
+        "interval": interval,
+        "bars": len(df),
+        "results": backtest_frame(df, rules, max_holding=max_holding) if len(df) else {},
+    }
+
+
+def _run_item(args):
+    item, rules, max_holding, store_root = args
+    return run_backtest(item["market"], item["symbol"], item["interval"], rules, max_holding, KlineStore(store_root))
+
+
+def run_backtests(items: list, rules=ALL_RULES, max_holding: int = None, processes: int = None,
+                  store: KlineStore = kline_store) -> list:
+    """
+    多进程回测多个交易对（items 与 MONITOR_SYMBOLS 格式相同），每个进程自行从本地存储读取K线
+    """
+    tasks = [(item, tuple(rules), max_holding, store.root) for item in items]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_run_item, tasks))
+
+
+if __name__ == "__main__":
+    from core.config import MONITOR_SYMBOLS
+
+    for report in run_backtests(MONITOR_SYMBOLS):
+        print(report["symbol"], report["interval"], report["bars"])
+        for rule, stats in report["results"].items():
+            print("  ", rule, stats)
@@ -0,0 +1,158 @@
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import FirstTouchIndex, evaluate_rule
+from services.indicators import calculate_rsi
+from services.market.kline_store import KLINE_COLUMNS, KlineStore, kline_store
+
+logger = logging.getLogger(__name__)
+
+# 共享内存中每个数据集按列存放：K线各列 + 预先计算好的 RSI（open_time 毫秒值可被 float64 精确表示）
+SHARED_COLUMNS = KLINE_COLUMNS + ("rsi",)
+
+
+def expand_grid(grid: dict):
+    """
+    {"tp_mult": [1.5, 2], "length": [5, 8]} -> 依次产出每种参数组合（惰性，不占用内存）
+    """
+    keys = list(grid)
+    for values in itertools.product(*(grid[key] for key in keys)):
+        yield dict(zip(keys, values))
+
+
+class SharedKlines:
+    """
+    把多个 market/symbol/interval 的K线放进 multiprocessing.shared_memory，
+    worker 只接收共享内存名称和形状，按名称映射后直接使用，不复制也不序列化价格数据。
+    """
+
+    def __init__(self):
+        self.blocks = {}
+        self.descriptors = {}
+
+    def add(self, key: tuple, df: pd.DataFrame):
+        data = np.empty((len(SHARED_COLUMNS), len(df)), dtype=np.float64)
+        for row, column in enumerate(KLINE_COLUMNS):
+            data[row] = df[column].to_numpy(dtype=np.float64)
+        data[-1] = calculate_rsi(df).to_numpy(dtype=np.float64)
+
+        block = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        np.ndarray(data.shape, dtype=np.float64, buffer=block.buf)[:] = data
+        self.blocks[key] = block
+        self.descriptors[key] = (block.name, data.shape)
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+        self.descriptors.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# worker 进程内的数据集缓存：{key: (df, high_index, low_index, rsi)}，在进程初始化时构建一次
+_worker_blocks = []
+_worker_datasets = {}
+
+
+def _attach(descriptors: dict):
+    for key, (name, shape) in descriptors.items():
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        data = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        df = pd.DataFrame({column: data[row] for row, column in enumerate(KLINE_COLUMNS)}, copy=False)
+        df["open_time"] = df["open_time"].astype(np.int64)
+        _worker_datasets[key] = (
+            df,
+            FirstTouchIndex(data[KLINE_COLUMNS.index("high")], "max"),
+            FirstTouchIndex(data[KLINE_COLUMNS.index("low")], "min"),
+            data[-1],
+        )
+
+
+def _evaluate(task):
+    key, rule, params, max_holding = task
+    df, high_index, low_index, rsi_values = _worker_datasets[key]
+    market, symbol, interval = key
+    record = {"market": market, "symbol": symbol, "interval": interval, "rule": rule, "params": params}
+    try:
+        record.update(evaluate_rule(df, rule, params, max_holding, high_index, low_index, rsi_values))
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def load_datasets(items: list, store: KlineStore = kline_store) -> dict:
+    """
+    从本地K线存储读取全部历史，items 与 MONITOR_SYMBOLS 格式相同
+    """
+    datasets = {}
+    for item in items:
+        key = (item["market"], item["symbol"], item["interval"])
+        df = store.read(*key)
+        if df.empty:
+            logger.warning(f"{key} 本地没有K线数据，跳过")
+            continue
+        datasets[key] = df
+    return datasets
+
+
+def run_sweep(datasets: dict, rule: str, grid: dict, output_path: str, max_holding: int = None,
+              processes: int = None, chunksize: int = 8) -> int:
+    """
+    对每个数据集评估 grid 中的全部参数组合：
+    - datasets: {(market, symbol, interval): K线 DataFrame}，只在开始时写入共享内存一次
+    - 结果按完成顺序逐行写入 output_path（JSON Lines），内存中不保留结果
+    返回写入的结果条数
+    """
+    tasks = (
+        (key, rule, params, max_holding)
+        for params in expand_grid(grid)
+        for key in datasets
+    )
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    count = 0
+    start = time.time()
+    with SharedKlines() as shared:
+        for key, df in datasets.items():
+            shared.add(key, df.reset_index(drop=True))
+
+        with multiprocessing.Pool(processes, initializer=_attach, initargs=(shared.descriptors,)) as pool, \
+                open(output_path, "w", encoding="utf-8") as f:
+            for record in pool.imap_unordered(_evaluate, tasks, chunksize=chunksize):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+                if count % 1000 == 0:
+                    f.flush()
+                    logger.info(f"参数扫描进度：{count} 条，耗时 {time.time() - start:.1f}s")
+
+    logger.info(f"参数扫描完成：{count} 条结果写入 {output_path}，耗时 {time.time() - start:.1f}s")
+    return count
+
+
+def load_sweep_results(output_path: str) -> pd.DataFrame:
+    """
+    读取 run_sweep 的输出，params 展开为列，便于排序筛选
+    """
+    with open(output_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    df = pd.DataFrame(records)
+    if "params" in df.columns:
+        df = pd.concat([df.drop(columns="params"), pd.json_normalize(df["params"].tolist())], axis=1)
+    return df
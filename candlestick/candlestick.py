@@ -1,8 +1,17 @@
 import re
 
+import numpy as np
+import pandas as pd
+
 __builders = dict()
 __default_ohlc = ['open', 'high', 'low', 'close']
 
+PATTERN_NAMES = ('bearish_engulfing', 'bearish_harami', 'bullish_engulfing', 'bullish_harami',
+                 'dark_cloud_cover', 'doji', 'doji_star', 'dragonfly_doji', 'evening_star',
+                 'evening_star_doji', 'gravestone_doji', 'hammer', 'hanging_man', 'inverted_hammer',
+                 'morning_star', 'morning_star_doji', 'piercing_pattern', 'rain_drop', 'rain_drop_doji',
+                 'shooting_star', 'star')
+
 
 def __get_file_name(class_name):
     res = re.findall('[A-Z][^A-Z]*', class_name)
@@ -31,8 +40,92 @@ def __get_class_by_name(class_name):
     return getattr(module, class_name)
 
 
-def __create_object(class_name, target):
-    return __get_class_by_name(class_name)(target=target)
+def __create_object(class_name, target, **params):
+    return __get_class_by_name(class_name)(target=target, **params)
+
+
+def __get_class_name(pattern_name):
+    return ''.join([cur.capitalize() for cur in pattern_name.split('_')])
+
+
+def create_pattern(pattern_name, target=None, **params):
+    """
+    params: optional thresholds accepted by the pattern class (e.g. hammer
+    shadow ratios); omitted values keep the class defaults.
+    """
+    if pattern_name not in PATTERN_NAMES:
+        raise Exception('Unknown candlestick pattern: ' + pattern_name)
+    return __create_object(__get_class_name(pattern_name), target, **params)
+
+
+def __get_values(candles_df, ohlc):
+    if not isinstance(candles_df, pd.DataFrame):
+        raise Exception('Candles must be in Panda data frame type')
+    if not ohlc or len(ohlc) != 4:
+        raise Exception('Provide list of four elements indicating columns in strings. '
+                        'Default: [open, high, low, close]')
+    if not set(ohlc).issubset(candles_df.columns):
+        raise Exception('Provided columns does not exist in given data frame')
+
+    return tuple(pd.to_numeric(candles_df[column]).to_numpy(dtype=float) for column in ohlc)
+
+
+def scan(candles_df,
+         patterns=PATTERN_NAMES,
+         ohlc=__default_ohlc,
+         is_reversed=False):
+    """
+    Evaluates several patterns in one pass over shared OHLC arrays.
+    Returns a bool matrix of shape (len(candles_df), len(patterns)); column j
+    belongs to patterns[j]. Rows without enough candles for a pattern are False.
+    """
+    values = __get_values(candles_df, ohlc)
+    shifted_values = {}
+    result = np.zeros((len(candles_df), len(patterns)), dtype=bool)
+
+    for col, pattern_name in enumerate(patterns):
+        cndl = create_pattern(pattern_name)
+        cndl.prepare_values(*values, shifted_values=shifted_values)
+        result[:, col] = cndl.evaluate(is_reversed)[0]
+
+    return result
+
+
+def scan_last(candles_df,
+              patterns=PATTERN_NAMES,
+              ohlc=__default_ohlc,
+              row=-1,
+              is_reversed=False):
+    """
+    Evaluates patterns only on the candle at position `row` (e.g. -2 for the last
+    confirmed candle), reading just the required_count candles around it, so the
+    cost does not grow with the length of candles_df.
+    Returns a bool array aligned with patterns.
+    """
+    rows_len = len(candles_df)
+    if not -rows_len <= row < rows_len:
+        raise Exception('Row {0} is out of range for {1} candles'.format(row, rows_len))
+    row = row % rows_len
+
+    cndls = [create_pattern(pattern_name) for pattern_name in patterns]
+    window = max([cndl.required_count for cndl in cndls], default=1)
+
+    if is_reversed:
+        start = row
+        window_df = candles_df.iloc[row:row + window]
+    else:
+        start = max(row + 1 - window, 0)
+        window_df = candles_df.iloc[start:row + 1]
+
+    values = __get_values(window_df, ohlc)
+    shifted_values = {}
+    result = np.zeros(len(patterns), dtype=bool)
+
+    for col, cndl in enumerate(cndls):
+        cndl.prepare_values(*values, shifted_values=shifted_values)
+        result[col] = cndl.evaluate(is_reversed)[0][row - start]
+
+    return result
 
 
 def bullish_hanging_man(candles_df,
@@ -30,3 +30,12 @@ class BearishEngulfing(CandlestickFinder):
         #         abs(close - open) / (high - low) >= 0.7 and
         #         prev_high < open and
         #         prev_low > close)
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((open >= prev_close) & (prev_close > prev_open) &
+                (open > close) &
+                (prev_open >= close) &
+                (open - close > prev_close - prev_open))
@@ -27,4 +27,12 @@ class BearishHarami(CandlestickFinder):
 
         return (prev_close > prev_open and
                 prev_open <= close < open <= prev_close and
-                open - close < prev_close - prev_open)
\ No newline at end of file
+                open - close < prev_close - prev_open)
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((prev_close > prev_open) &
+                (prev_open <= close) & (close < open) & (open <= prev_close) &
+                (open - close < prev_close - prev_open))
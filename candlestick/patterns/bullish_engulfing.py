@@ -30,3 +30,12 @@ class BullishEngulfing(CandlestickFinder):
                 close > open and
                 prev_close >= open and
                 close - open > prev_open - prev_close)
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((close >= prev_open) & (prev_open > prev_close) &
+                (close > open) &
+                (prev_close >= open) &
+                (close - open > prev_open - prev_close))
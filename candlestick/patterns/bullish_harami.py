@@ -28,3 +28,11 @@ class BullishHarami(CandlestickFinder):
         return (prev_open > prev_close and
                 prev_close <= open < close <= prev_open and
                 close - open < prev_open - prev_close)
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((prev_open > prev_close) &
+                (prev_close <= open) & (open < close) & (close <= prev_open) &
+                (close - open < prev_open - prev_close))
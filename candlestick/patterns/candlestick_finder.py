@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 
@@ -11,6 +12,11 @@ class CandlestickFinder(object):
         self.low_column = 'low'
         self.high_column = 'high'
         self.data = None
+        self.open_values = None
+        self.high_values = None
+        self.low_values = None
+        self.close_values = None
+        self.shifted_values = {}
         self.is_data_prepared = False
         self.multi_coeff = -1
 
@@ -25,6 +31,55 @@ class CandlestickFinder(object):
     def logic(self, row_idx):
         raise Exception('Implement the logic of ' + self.get_class_name())
 
+    def vectorized_logic(self):
+        raise Exception('Implement the vectorized logic of ' + self.get_class_name())
+
+    def candle(self, offset=0):
+        """
+        Returns (open, high, low, close) arrays aligned so that element i holds
+        the candle `offset` bars before row i (after row i when reversed).
+        Positions without such a candle are NaN.
+        """
+        shift = offset * self.multi_coeff
+        if shift not in self.shifted_values:
+            self.shifted_values[shift] = tuple(self._shift(values, shift) for values in (self.open_values,
+                                                                                         self.high_values,
+                                                                                         self.low_values,
+                                                                                         self.close_values))
+        return self.shifted_values[shift]
+
+    @staticmethod
+    def _shift(values, shift):
+        if shift == 0:
+            return values
+        shifted = np.full(len(values), np.nan)
+        if shift < 0:
+            shifted[-shift:] = values[:shift]
+        else:
+            shifted[:-shift] = values[shift:]
+        return shifted
+
+    def evaluate(self, is_reversed):
+        """
+        Evaluates the pattern over all prepared rows at once.
+        Returns (matched, valid) boolean arrays; rows outside `valid` do not have
+        enough neighbouring candles and are reported as None by has_pattern.
+        """
+        rows_len = len(self.close_values)
+        valid = np.zeros(rows_len, dtype=bool)
+
+        if is_reversed:
+            self.multi_coeff = 1
+            valid[:max(rows_len - self.required_count + 1, 0)] = True
+        else:
+            self.multi_coeff = -1
+            valid[self.required_count - 1:] = True
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matched = np.asarray(self.vectorized_logic(), dtype=bool)
+
+        return matched & valid, valid
+
     def has_pattern(self,
                     candles_df,
                     ohlc,
@@ -33,37 +88,29 @@ class CandlestickFinder(object):
                           ohlc)
 
         if self.is_data_prepared:
-            results = []
-            rows_len = len(candles_df)
-            idxs = candles_df.index.values
-
-            if is_reversed:
-                self.multi_coeff = 1
-
-                for row_idx in range(rows_len - 1, -1, -1):
+            matched, valid = self.evaluate(is_reversed)
+            results = matched if valid.all() else np.where(valid, matched, None)
 
-                    if row_idx <= rows_len - self.required_count:
-                        results.append([idxs[row_idx], self.logic(row_idx)])
-                    else:
-                        results.append([idxs[row_idx], None])
-
-            else:
-                self.multi_coeff = -1
-
-                for row in range(0, rows_len, 1):
-
-                    if row >= self.required_count - 1:
-                        results.append([idxs[row], self.logic(row)])
-                    else:
-                        results.append([idxs[row], None])
-
-            candles_df = candles_df.join(pd.DataFrame(results, columns=['row', self.target]).set_index('row'),
+            candles_df = candles_df.join(pd.DataFrame({'row': candles_df.index.values,
+                                                       self.target: results}).set_index('row'),
                                          how='outer')
 
             return candles_df
         else:
             raise Exception('Data is not prepared to detect patterns')
 
+    def prepare_values(self, open_values, high_values, low_values, close_values, shifted_values=None):
+        """
+        Prepares the finder from float arrays instead of a data frame.
+        Finders given the same `shifted_values` dict share their shifted arrays.
+        """
+        self.open_values = open_values
+        self.high_values = high_values
+        self.low_values = low_values
+        self.close_values = close_values
+        self.shifted_values = {} if shifted_values is None else shifted_values
+        self.is_data_prepared = True
+
     def prepare_data(self, candles_df, ohlc):
 
         if isinstance(candles_df, pd.DataFrame):
@@ -95,6 +142,12 @@ class CandlestickFinder(object):
                 if not is_numeric_dtype(self.data[self.high_column]):
                     self.data[self.high_column] = pd.to_numeric(candles_df[self.high_column])
 
+                self.open_values = self.data[self.open_column].to_numpy(dtype=float)
+                self.high_values = self.data[self.high_column].to_numpy(dtype=float)
+                self.low_values = self.data[self.low_column].to_numpy(dtype=float)
+                self.close_values = self.data[self.close_column].to_numpy(dtype=float)
+                self.shifted_values = {}
+
                 self.is_data_prepared = True
             else:
                 raise Exception('{0} requires at least {1} data'.format(self.name,
@@ -32,3 +32,14 @@ class DarkCloudCover(CandlestickFinder):
                 (open > prev_close) and
                 (close > prev_open) and
                 ((open - close) / (.001 + (high - low)) > 0.6))
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((prev_close > prev_open) &
+                (((prev_close + prev_open) / 2) > close) &
+                (open > close) &
+                (open > prev_close) &
+                (close > prev_open) &
+                ((open - close) / (.001 + (high - low)) > 0.6))
@@ -1,3 +1,5 @@
+import numpy as np
+
 from candlestick.patterns.candlestick_finder import CandlestickFinder
 
 
@@ -17,3 +19,10 @@ class Doji(CandlestickFinder):
         return abs(close - open) / (high - low) < 0.1 and \
                (high - max(close, open)) > (3 * abs(close - open)) and \
                (min(close, open) - low) > (3 * abs(close - open))
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+
+        return ((abs(close - open) / (high - low) < 0.1) &
+                ((high - np.maximum(close, open)) > (3 * abs(close - open))) &
+                ((np.minimum(close, open) - low) > (3 * abs(close - open))))
@@ -1,3 +1,5 @@
+import numpy as np
+
 from candlestick.patterns.candlestick_finder import CandlestickFinder
 
 
@@ -16,3 +18,10 @@ class DragonflyDoji(CandlestickFinder):
         return abs(close - open) / (high - low) < 0.1 and \
                (min(close, open) - low) > (3 * abs(close - open)) and \
                (high - max(close, open)) < abs(close - open)
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+
+        return ((abs(close - open) / (high - low) < 0.1) &
+                ((np.minimum(close, open) - low) > (3 * abs(close - open))) &
+                ((high - np.maximum(close, open)) < abs(close - open)))
@@ -1,9 +1,13 @@
+import numpy as np
+
 from candlestick.patterns.candlestick_finder import CandlestickFinder
 
 
 class Hammer(CandlestickFinder):
-    def __init__(self, target=None):
+    def __init__(self, target=None, lower_shadow_ratio=1.8, upper_shadow_range_ratio=0.2):
         super().__init__(self.get_class_name(), 1, target=target)
+        self.lower_shadow_ratio = lower_shadow_ratio
+        self.upper_shadow_range_ratio = upper_shadow_range_ratio
 
     def logic(self, idx):
         candle = self.data.iloc[idx]
@@ -49,11 +53,22 @@ class Hammer(CandlestickFinder):
         # 判断逻辑更严格，排除 Doji 和上影线太长的情况
         is_hammer = (
                 body > 0.001 and  # 实体必须有大小，避免Doji
-                lower_shadow >= 1.8 * body and  # 下影线至少是实体1.7倍
+                lower_shadow >= self.lower_shadow_ratio * body and  # 下影线至少是实体1.7倍
                 upper_shadow <= body and # 上影线不应比实体长
-                upper_shadow < total_range * 0.2  # 上影线占实体比 < 20%
+                upper_shadow < total_range * self.upper_shadow_range_ratio  # 上影线占实体比 < 20%
         )
 
         return is_hammer
 
+    def vectorized_logic(self):
+        open_price, high, low, close_price = self.candle(0)
+
+        body = abs(close_price - open_price)
+        upper_shadow = high - np.maximum(open_price, close_price)
+        lower_shadow = np.minimum(open_price, close_price) - low
+        total_range = high - low
 
+        return ((body > 0.001) &
+                (lower_shadow >= self.lower_shadow_ratio * body) &
+                (upper_shadow <= body) &
+                (upper_shadow < total_range * self.upper_shadow_range_ratio))
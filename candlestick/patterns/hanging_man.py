@@ -36,3 +36,14 @@ class HangingMan(CandlestickFinder):
                  ((open - low) / (.001 + high - low) >= 0.75)) and
                 prev_high < open and
                 b_prev_high < open)
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+        b_prev_open, b_prev_high, b_prev_low, b_prev_close = self.candle(2)
+
+        return (((high - low) > 4 * (open - close)) &
+                ((close - low) / (.001 + high - low) >= 0.75) &
+                ((open - low) / (.001 + high - low) >= 0.75) &
+                (prev_high < open) &
+                (b_prev_high < open))
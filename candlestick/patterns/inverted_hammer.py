@@ -2,8 +2,10 @@ from candlestick.patterns.candlestick_finder import CandlestickFinder
 
 
 class InvertedHammer(CandlestickFinder):
-    def __init__(self, target=None):
+    def __init__(self, target=None, range_body_ratio=3, shadow_ratio=0.6):
         super().__init__(self.get_class_name(), 1, target=target)
+        self.range_body_ratio = range_body_ratio
+        self.shadow_ratio = shadow_ratio
 
     def logic(self, idx):
         candle = self.data.iloc[idx]
@@ -13,6 +15,13 @@ class InvertedHammer(CandlestickFinder):
         high = candle[self.high_column]
         low = candle[self.low_column]
 
-        return (((high - low) > 3 * (open - close)) and
-                ((high - close) / (.001 + high - low) > 0.6)
-                and ((high - open) / (.001 + high - low) > 0.6))
+        return (((high - low) > self.range_body_ratio * (open - close)) and
+                ((high - close) / (.001 + high - low) > self.shadow_ratio)
+                and ((high - open) / (.001 + high - low) > self.shadow_ratio))
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+
+        return (((high - low) > self.range_body_ratio * (open - close)) &
+                ((high - close) / (.001 + high - low) > self.shadow_ratio) &
+                ((high - open) / (.001 + high - low) > self.shadow_ratio))
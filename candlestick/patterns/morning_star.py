@@ -1,3 +1,5 @@
+import numpy as np
+
 from candlestick.patterns.candlestick_finder import CandlestickFinder
 
 
@@ -38,3 +40,11 @@ class MorningStar(CandlestickFinder):
 
         return (max(prev_open, prev_close) < b_prev_close < b_prev_open and
                 close > open > max(prev_open, prev_close))
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+        b_prev_open, b_prev_high, b_prev_low, b_prev_close = self.candle(2)
+
+        return ((np.maximum(prev_open, prev_close) < b_prev_close) & (b_prev_close < b_prev_open) &
+                (close > open) & (open > np.maximum(prev_open, prev_close)))
@@ -1,3 +1,5 @@
+import numpy as np
+
 from candlestick.patterns.candlestick_finder import CandlestickFinder
 
 
@@ -37,3 +39,21 @@ class MorningStarDoji(CandlestickFinder):
                 close > b_prev_close
                 and (prev_high - max(prev_close, prev_open)) > (3 * abs(prev_close - prev_open))
                 and (min(prev_close, prev_open) - prev_low) > (3 * abs(prev_close - prev_open)))
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+        b_prev_open, b_prev_high, b_prev_low, b_prev_close = self.candle(2)
+
+        return ((b_prev_close < b_prev_open) &
+                (abs(b_prev_close - b_prev_open) / (b_prev_high - b_prev_low) >= 0.7) &
+                (abs(prev_close - prev_open) / (prev_high - prev_low) < 0.1) &
+                (close > open) &
+                (abs(close - open) / (high - low) >= 0.7) &
+                (b_prev_close > prev_close) &
+                (b_prev_close > prev_open) &
+                (prev_close < open) &
+                (prev_open < open) &
+                (close > b_prev_close) &
+                ((prev_high - np.maximum(prev_close, prev_open)) > (3 * abs(prev_close - prev_open))) &
+                ((np.minimum(prev_close, prev_open) - prev_low) > (3 * abs(prev_close - prev_open))))
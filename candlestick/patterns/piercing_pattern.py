@@ -30,3 +30,11 @@ class PiercingPattern(CandlestickFinder):
         return (prev_close < prev_open and
                 open < prev_low and
                 prev_open > close > prev_close + ((prev_open - prev_close) / 2))
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((prev_close < prev_open) &
+                (open < prev_low) &
+                (prev_open > close) & (close > prev_close + ((prev_open - prev_close) / 2)))
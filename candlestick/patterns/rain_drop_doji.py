@@ -1,3 +1,5 @@
+import numpy as np
+
 from candlestick.patterns.candlestick_finder import CandlestickFinder
 
 
@@ -26,3 +28,15 @@ class RainDropDoji(CandlestickFinder):
                 prev_close > open and
                 (high - max(close, open)) > (3 * abs(close - open)) and
                 (min(close, open) - low) > (3 * abs(close - open)))
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((prev_close < prev_open) &
+                (abs(prev_close - prev_open) / (prev_high - prev_low) >= 0.7) &
+                (abs(close - open) / (high - low) < 0.1) &
+                (prev_close > close) &
+                (prev_close > open) &
+                ((high - np.maximum(close, open)) > (3 * abs(close - open))) &
+                ((np.minimum(close, open) - low) > (3 * abs(close - open))))
@@ -1,3 +1,5 @@
+import numpy as np
+
 from candlestick.patterns.candlestick_finder import CandlestickFinder
 
 
@@ -22,3 +24,11 @@ class ShootingStar(CandlestickFinder):
         return (prev_open < prev_close < open and
                 high - max(open, close) >= abs(open - close) * 3 and
                 min(close, open) - low <= abs(open - close))
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((prev_open < prev_close) & (prev_close < open) &
+                (high - np.maximum(open, close) >= abs(open - close) * 3) &
+                (np.minimum(close, open) - low <= abs(open - close)))
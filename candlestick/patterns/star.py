@@ -24,3 +24,13 @@ class Star(CandlestickFinder):
                 0.3 > abs(close - open) / (high - low) >= 0.1 and
                 prev_close < close and
                 prev_close < open)
+
+    def vectorized_logic(self):
+        open, high, low, close = self.candle(0)
+        prev_open, prev_high, prev_low, prev_close = self.candle(1)
+
+        return ((prev_close > prev_open) &
+                (abs(prev_close - prev_open) / (prev_high - prev_low) >= 0.7) &
+                (0.3 > abs(close - open) / (high - low)) & (abs(close - open) / (high - low) >= 0.1) &
+                (prev_close < close) &
+                (prev_close < open))
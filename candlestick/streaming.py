@@ -0,0 +1,89 @@
+import numpy as np
+
+from candlestick.candlestick import PATTERN_NAMES, create_pattern
+
+
+class CandleRingBuffer(object):
+    def __init__(self, size):
+        self.size = size
+        self.values = np.full((4, size), np.nan)
+        self.count = 0
+        self.last_open_time = None
+
+    def append(self, open, high, low, close):
+        pos = self.count % self.size
+        self.values[:, pos] = (open, high, low, close)
+        self.count += 1
+
+    def ordered_values(self):
+        """
+        Returns the buffered (open, high, low, close) arrays, oldest candle first.
+        """
+        if self.count < self.size:
+            ordered = self.values[:, :self.count]
+        else:
+            start = self.count % self.size
+            ordered = np.concatenate((self.values[:, start:], self.values[:, :start]), axis=1)
+        return tuple(ordered)
+
+
+class StreamingPatternDetector(object):
+    """
+    Receives closed candles one at a time and reports which patterns fired on
+    the newest one. Every symbol/interval keeps only the few candles the
+    patterns need, so each update costs O(patterns) regardless of history.
+    """
+
+    def __init__(self, patterns=PATTERN_NAMES, ohlc=('open', 'high', 'low', 'close')):
+        self.patterns = tuple(patterns)
+        self.ohlc = list(ohlc)
+        self.cndls = [create_pattern(pattern_name) for pattern_name in self.patterns]
+        self.window = max([cndl.required_count for cndl in self.cndls], default=1)
+        self.buffers = {}
+
+    def update(self, symbol, interval, candle):
+        """
+        candle: mapping (dict, Series, ...) with the ohlc keys and optionally
+        'open_time'. A candle whose open_time is not newer than the last one
+        seen for the symbol/interval is ignored.
+        Returns the names of the patterns found on this candle.
+        """
+        key = (symbol, interval)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = CandleRingBuffer(self.window)
+
+        open_time = candle.get('open_time') if hasattr(candle, 'get') else None
+        if open_time is not None:
+            if buffer.last_open_time is not None and open_time <= buffer.last_open_time:
+                return []
+            buffer.last_open_time = open_time
+
+        buffer.append(*[float(candle[column]) for column in self.ohlc])
+        values = buffer.ordered_values()
+        shifted_values = {}
+        fired = []
+
+        for pattern_name, cndl in zip(self.patterns, self.cndls):
+            cndl.prepare_values(*values, shifted_values=shifted_values)
+            if cndl.evaluate(False)[0][-1]:
+                fired.append(pattern_name)
+
+        return fired
+
+    def warm_up(self, symbol, interval, candles_df):
+        """
+        Seeds the buffer of a symbol/interval with the last closed candles of
+        candles_df, without reporting patterns.
+        """
+        self.reset(symbol, interval)
+        buffer = self.buffers[(symbol, interval)] = CandleRingBuffer(self.window)
+        tail = candles_df.iloc[-self.window:]
+
+        for open, high, low, close in tail[self.ohlc].to_numpy(dtype=float):
+            buffer.append(open, high, low, close)
+        if 'open_time' in tail.columns and len(tail):
+            buffer.last_open_time = tail['open_time'].iloc[-1]
+
+    def reset(self, symbol, interval):
+        self.buffers.pop((symbol, interval), None)
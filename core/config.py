@@ -5,7 +5,62 @@ SERVER_CONFIG = {
 }
 PROXY_ADDRESS = "http://127.0.0.1:7890"
 BINANCE_BASE_URL = "https://api.binance.com/api/v3/"
+# Binance 异步客户端连接池大小与超时（秒）
+BINANCE_MAX_CONNECTIONS = 20
+BINANCE_MAX_KEEPALIVE = 10
+BINANCE_TIMEOUT = 10
+# 批量回填历史K线：每分钟请求权重预算、单次 klines 请求权重、并发交易对数、每个交易对预取的分页数
+BINANCE_WEIGHT_PER_MINUTE = 2400
+BINANCE_KLINES_WEIGHT = 2
+BACKFILL_CONCURRENCY = 4
+BACKFILL_PREFETCH = 4
+# 本地K线存储目录（按 market/symbol/interval 分目录）
+KLINE_STORE_DIR = "data/klines"
+# 扫描并发数、单个交易对扫描超时与单个信号 LLM 分析超时（秒）
+SCAN_CONCURRENCY = 8
+SCAN_SYMBOL_TIMEOUT = 120
+LLM_ANALYSIS_TIMEOUT = 120
+# 指标结果缓存上限（字节）
+INDICATOR_CACHE_MAX_BYTES = 64 * 1024 * 1024
 
+# LLM 客户端：每个服务商的最大并发请求数、每分钟请求数、连接池大小与超时（秒）
+LLM_MAX_CONCURRENCY = 4
+LLM_REQUESTS_PER_MINUTE = 60
+LLM_MAX_CONNECTIONS = 10
+LLM_TIMEOUT = 60
+# LLM 分析结果缓存：内存条目数上限、有效期（秒）、SQLite 磁盘层路径（设为 None 则只用内存）
+LLM_CACHE_MAX_ENTRIES = 1024
+LLM_CACHE_TTL = 24 * 60 * 60
+LLM_CACHE_DB = "data/llm_cache.sqlite3"
+# 信号去重：已分析并告警的 (symbol, interval, pattern, K线 open_time) 记录在 SQLite 中，重启后仍然有效；
+# 内存中保留的条目数上限、记录保留时长（秒）、处理中的信号多久未完成视为失效可重新处理（秒）、
+# 分析或发送失败的信号在之后的扫描中最多重试几次
+SIGNAL_STORE_DB = "data/signals.sqlite3"
+SIGNAL_STORE_MAX_ENTRIES = 4096
+SIGNAL_STORE_RETENTION = 7 * 24 * 60 * 60
+SIGNAL_CLAIM_TTL = 600
+SIGNAL_MAX_RETRIES = 3
+# LLM prompt 中K线价格保留的小数位（未配置的交易对按价格量级自动选择）与是否使用差值编码
+PROMPT_PRICE_PRECISION = {"BTCUSDT": 1, "ETHUSDT": 2, "SOLUSDT": 2, "DOGEUSDT": 5, "XRPUSDT": 4}
+PROMPT_DELTA_ENCODING = False
+# LLM 前的本地打分：各项权重、放行阈值、支撑/阻力接近程度、EMA 周期、斜率计算跨度与“明显”斜率、各方向 RSI 区间
+# （阈值高于 level 的权重：只接近价位不够，还需要趋势、RSI 或放量中至少一项配合）
+PRESCORE_WEIGHTS = {"level": 2, "trend": 1, "rsi": 1, "volume": 1}
+PRESCORE_THRESHOLD = 3
+PRESCORE_LEVEL_TOLERANCE = 0.005
+PRESCORE_EMA_PERIOD = 20
+PRESCORE_SLOPE_BARS = 5
+PRESCORE_SLOPE_THRESHOLD = 0.002
+PRESCORE_RSI_BANDS = {"long": (20, 55), "short": (45, 80)}
+# 通知：请求超时与重试次数、首次重试等待（秒，之后指数递增）、各渠道限速（突发条数, 秒），
+# 以及是否把同一轮扫描的告警合并成一条消息
+NOTIFY_TIMEOUT = 10
+NOTIFY_MAX_RETRIES = 3
+NOTIFY_RETRY_BACKOFF = 1
+TELEGRAM_RATE_LIMIT = (20, 60)
+DISCORD_RATE_LIMIT = (5, 2)
+NOTIFY_COALESCE = False
+# 可选 resample_intervals（如 ["1h", "4h"]）：由本地已存的 interval K线聚合出更大周期一起扫描，不额外请求交易所
 MONITOR_SYMBOLS = [
     {"symbol": "BTCUSDT", "market": "binance","interval": "15m"},
     {"symbol": "ETHUSDT", "market": "binance","interval": "15m"},
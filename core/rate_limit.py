@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    异步令牌桶：容量 capacity，每 period 秒补满一次（匀速补充）；
+    acquire 在令牌不足时按先来先到的顺序等待
+    """
+
+    def __init__(self, capacity: float, period: float = 60):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """
+        服务端要求等待（如 429 的 Retry-After）时，清空令牌并在 seconds 秒内不再放行
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
@@ -0,0 +1,17 @@
+import os
+import sqlite3
+
+
+def connect_sqlite(db_path: str, schema: str, timeout: float = 5.0) -> sqlite3.Connection:
+    """
+    打开（必要时创建）SQLite 数据库并建表：连接可在线程间共享（调用方自行加锁），
+    使用 WAL，多个进程可同时读写
+    """
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    db = sqlite3.connect(db_path, check_same_thread=False, timeout=timeout)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(schema)
+    db.commit()
+    return db
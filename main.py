@@ -4,6 +4,11 @@ import uvicorn
 from core.config import SERVER_CONFIG
 from core.logger import init_logger
 from scheduler.task_runner import start_scheduler
+from services.market.binance import close_binance_client
+from services.llm import close_llm_providers
+from services.llm_cache import llm_cache
+from services.notifier import close_notifier
+from services.signal_store import signal_store
 # 初始化日志
 init_logger()
 app = FastAPI()
@@ -16,5 +21,14 @@ async def startup_event():
     logging.getLogger(__name__).info("Scheduler 启动完成")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_binance_client()
+    await close_llm_providers()
+    await close_notifier()
+    llm_cache.close()
+    signal_store.close()
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", **SERVER_CONFIG)
\ No newline at end of file
@@ -1,20 +1,24 @@
+import asyncio
 import json
 import logging
+import time
 
-import httpx
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
 
-from core.config import MONITOR_SYMBOLS
-from services.market import fetch_klines_by_market
-from services.indicators import calculate_rsi, get_hammer_signal, get_inverted_hammer_signal,  \
+from core.config import MONITOR_SYMBOLS, SCAN_CONCURRENCY, SCAN_SYMBOL_TIMEOUT, LLM_ANALYSIS_TIMEOUT, \
+    PROMPT_DELTA_ENCODING, NOTIFY_COALESCE, SIGNAL_MAX_RETRIES
+from services.market import fetch_klines_by_market_async
+from services.market.resample import base_bars_needed, read_resampled
+from services.indicators import get_hammer_signal, get_inverted_hammer_signal,  \
     get_bearish_engulfing_signal, get_bullish_engulfing_signal
-import os
-load_dotenv()  # 自动读取 .env 文件
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-SILICONFLOW_API_KEY = os.getenv("SILICONFLOW_API_KEY")
-USE_SILICONFLOW = os.getenv("USE_SILICONFLOW", "false").lower() == "true"
+from services.streaming_indicators import get_symbol_indicators
+from services.indicator_cache import cached_scan_last, indicator_cache
+from services.llm import get_llm_providers
+from services.llm_cache import analysis_key, llm_cache
+from services.prompt_encoder import encode_klines
+from services.notifier import send_alert, notification_dispatcher
+from services.prescore import prescorer
+from services.signal_store import signal_store
 scheduler = AsyncIOScheduler()
 logger = logging.getLogger(__name__)
 
@@ -24,58 +28,96 @@ logger = logging.getLogger(__name__)
 async def llm_call_async(prompt: str) -> str:
     """
     自动根据环境变量选择使用 OpenAI 或 SiliconFlow。
+    服务商客户端在进程内复用（services.llm），并按服务商限制并发与请求速率。
     prompt: 完整文本提示
     return: 模型返回的文本结果
     """
+    messages = [
+        {"role": "system", "content": "你是一位专业的量化交易分析师，只依据技术面判断市场。"},
+        {"role": "user", "content": prompt}
+    ]
+    providers = get_llm_providers()
+    if not providers:
+        raise RuntimeError("缺少 OPENAI_API_KEY 或 SILICONFLOW_API_KEY")
 
-    # 优先使用 SiliconFlow
-    if USE_SILICONFLOW and SILICONFLOW_API_KEY:
+    # 优先使用 SiliconFlow，失败时回退到 OpenAI
+    for i, provider in enumerate(providers):
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {SILICONFLOW_API_KEY}"
-                }
-                payload = {
-                    "model": "Qwen/Qwen2.5-72B-Instruct",  # 推荐模型（中文能力强）
-                    "messages": [
-                        {"role": "system", "content": "你是一位专业的量化交易分析师，只依据技术面判断市场。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 1024,
-                }
-                resp = await client.post(
-                    "https://api.siliconflow.cn/v1/chat/completions",
-                    json=payload,
-                    headers=headers
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                return data["choices"][0]["message"]["content"]
+            return await provider.complete(messages, temperature=0.1)
         except Exception as e:
-            logger.warning(f"[SiliconFlow] 请求失败，回退到 OpenAI: {e}")
+            if i == len(providers) - 1:
+                logger.error(f"[{provider.name}] 调用失败: {e}")
+                raise
+            logger.warning(f"[{provider.name}] 请求失败，回退到 {providers[i + 1].name}: {e}")
 
-    # 默认使用 OpenAI
-    if not OPENAI_API_KEY:
+async def llm_stream_async(prompt: str):
+    """
+    llm_call_async 的流式版本，逐段产出模型输出；
+    服务商在输出第一段之前失败时回退到下一个服务商，之后失败则直接抛出
+    """
+    messages = [
+        {"role": "system", "content": "你是一位专业的量化交易分析师，只依据技术面判断市场。"},
+        {"role": "user", "content": prompt}
+    ]
+    providers = get_llm_providers()
+    if not providers:
         raise RuntimeError("缺少 OPENAI_API_KEY 或 SILICONFLOW_API_KEY")
 
-    client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-    try:
-        resp = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "你是一位专业的量化交易分析师，只依据技术面判断市场。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1
-        )
-        return resp.choices[0].message.content
-    except Exception as e:
-        logger.error(f"[OpenAI] 调用失败: {e}")
-        raise
+    for i, provider in enumerate(providers):
+        started = False
+        try:
+            async for chunk in provider.stream(messages, temperature=0.1):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or i == len(providers) - 1:
+                logger.error(f"[{provider.name}] 调用失败: {e}")
+                raise
+            logger.warning(f"[{provider.name}] 请求失败，回退到 {providers[i + 1].name}: {e}")
+
+
+def parse_llm_decision(llm_text: str, final: bool = True):
+    """
+    从模型输出中判断是否推荐：出现“推荐”或第 3 行含 Recommend 即为 recommend；
+    final=False 用于流式输出的中途判断，尚无法确定时返回 None
+    """
+    lines = llm_text.splitlines()
+    third_line_done = len(lines) > 3 or (len(lines) == 3 and llm_text.endswith("\n"))
+    if "推荐" in llm_text or (len(lines) > 2 and (final or third_line_done) and "Recommend" in lines[2]):
+        return "recommend"
+    return "uncertain" if final else None
+
+
+# 固定不变的说明放在 prompt 开头，服务商可以复用已缓存的前缀
+ANALYSIS_INSTRUCTIONS = """
+你是一个严格基于技术面的专业交易分析师（只使用下面给出的 K 线数据和信号），不要引入外部基本面或新闻因素。
+同时你的交易系统为追随趋势交易，当锤子线或者看涨吞没信号在支撑位或者上涨趋势结构中出现时做多，当倒锤子线或看跌吞没信号出现在阻力位或者下降趋势结构时做空。
+
+请根据文末的信号和K线回答以下问题：
+1) 信号是否满足交易系统: 是/否（如果是，请说明信号处于什么位置）；
+2) 信号是否与趋势方向一致: Up/Down/Sideways（请简要说明）；
+3) 信号是否值得入场操作: Recommend/Reject（请说明推荐或拒绝的理由）。
+"""
+
+
+def build_prompt(signal_data: dict, kline_data, symbol: str = None) -> tuple:
+    """
+    生成发送给 LLM 的 prompt，返回 (prompt, encode_klines 的结果)。
+    K线以紧凑 CSV 编码（services.prompt_encoder），symbol 用于选择价格精度
+    """
+    encoded = encode_klines(kline_data, symbol=symbol, delta=PROMPT_DELTA_ENCODING)
+    prompt = f"""{ANALYSIS_INSTRUCTIONS}
+信号JSON:
+{json.dumps(signal_data, ensure_ascii=False, separators=(",", ":"), default=str)}
+
+最近{len(kline_data)}根K线（{encoded["header"]}）：
+{encoded["text"]}
+"""
+    return prompt, encoded
 
-async def analyze_with_llm(signal_data: dict, kline_data: list) -> dict:
+
+async def analyze_with_llm(signal_data: dict, kline_data, symbol: str = None, interval: str = None) -> dict:
     """
     把 signal 和最近 K 线打包成 prompt 给 LLM，让 LLM 判断：
      - 是否在支撑位
@@ -87,76 +129,209 @@ async def analyze_with_llm(signal_data: dict, kline_data: list) -> dict:
         "llm_decision": "recommend"|"reject"|"uncertain",
         "llm_reason": "..."
       }
+    分析结果按 prompt 内容缓存（services.llm_cache）：同一交易对/周期、同一已收盘K线窗口与信号、同一指令和编码方式、
+    同一模型链时直接返回，重试或重复触发不再请求 LLM
     """
+    model = "|".join(provider.model for provider in get_llm_providers())
+    cache_key = analysis_key(build_prompt(signal_data, kline_data[:-1], symbol)[0], model, symbol, interval)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    prompt = f"""
-你是一个严格基于技术面的专业交易分析师（只使用下面给出的 K 线数据和信号），不要引入外部基本面或新闻因素。
-同时你的交易系统为追随趋势交易，当锤子线或者看涨吞没信号在支撑位或者上涨趋势结构中出现时做多，当倒锤子线或看跌吞没信号出现在阻力位或者下降趋势结构时做空。
-信号JSON:
-{signal_data}
-
-最近120根K线（列：timestamp,open,high,low,close,volume），时间按 UTC：
-{kline_data}
-
-
-
-请回答以下问题：
-1) 信号是否满足交易系统: 是/否（如果是，请说明信号处于什么位置）；
-2) 信号是否与趋势方向一致: Up/Down/Sideways（请简要说明）；
-3) 信号是否值得入场操作: Recommend/Reject（请说明推荐或拒绝的理由）。
-"""
+    prompt, encoded = build_prompt(signal_data, kline_data, symbol)
+    logger.info(f"K线编码 {encoded['tokens']} tokens，比完整原始 CSV 节省 {encoded['saved_tokens']} tokens")
 
-    llm_text = await llm_call_async(prompt)
+    # 流式接收输出，边接收边解析，能确定推荐时立即记录
+    chunks = []
+    decision = None
+    start = time.monotonic()
+    async for chunk in llm_stream_async(prompt):
+        chunks.append(chunk)
+        if decision is None:
+            decision = parse_llm_decision("".join(chunks), final=False)
+            if decision is not None:
+                logger.info(f"[LLM] {symbol} 第 {time.monotonic() - start:.1f}s 已判定: {decision}")
+    llm_text = "".join(chunks)
     # 这里做最小解析：尽量抽取关键关键词；更复杂的解析可按需增强
     # 将 llm_text 返回给上层，让调用方决定如何解读
-    return {
+    result = {
         "llm_raw": llm_text,
-        "llm_decision": "recommend" if "推荐" in llm_text or "Recommend" in llm_text.splitlines()[2] else "uncertain",
+        "llm_decision": parse_llm_decision(llm_text),
     }
+    llm_cache.put(cache_key, result)
+    return result
+
+
+
+async def scan_symbol(item: dict) -> list:
+    """
+    扫描单个交易对：拉取K线 → 形态检测，检测到信号时启动 LLM 分析任务并返回这些任务（不等待分析完成）。
+    item 中的 resample_intervals（如 ["1h", "4h"]）由本地已存的基础周期K线聚合得到，不额外请求交易所；
+    为此同步时本地至少保留聚合所需的基础K线，不足时（如首次同步）向前翻页补齐
+    """
+    resample_intervals = item.get("resample_intervals", ())
+    df = await fetch_klines_by_market_async(
+        market=item["market"],
+        symbol=item["symbol"],
+        interval=item["interval"],
+        limit=120,
+        history=max((base_bars_needed(item["interval"], interval, 120) for interval in resample_intervals),
+                    default=None)
+    )
+    frames = [(item["interval"], df)]
+    for interval in resample_intervals:
+        frames.append((interval, await asyncio.to_thread(read_resampled, item["market"], item["symbol"],
+                                                         item["interval"], interval, limit=120)))
+
+    analyses = []
+    for interval, frame in frames:
+        analysis = await scan_frame(item, interval, frame)
+        if analysis is not None:
+            analyses.append(analysis)
+    return analyses
+
+
+SIGNAL_GETTERS = (("hammer", get_hammer_signal),
+                  ("inverted_hammer", get_inverted_hammer_signal),
+                  ("bearish_engulfing", get_bearish_engulfing_signal),
+                  ("bullish_engulfing", get_bullish_engulfing_signal))
+
+
+async def scan_frame(item: dict, interval: str, df):
+    """
+    对一个周期的K线做形态检测，有信号时返回已启动的 LLM 分析任务，否则返回 None
+    """
+    # 指标状态只吸收新收盘的K线，rsi 对应倒数第二根已收盘K线
+    indicators = get_symbol_indicators(item["market"], item["symbol"], interval).sync(df)
+    rsi = indicators.rsi.value
+    if rsi is None:
+        logger.info(f"[SKIP] {item['symbol']} {interval} K线数量不足（{len(df)} 根）")
+        return None
+
+    # 四种形态在一次 scan_last 中检测，结果按已收盘窗口缓存，同一窗口重复扫描时只是一次字典查找；
+    # 按优先级取第一个触发的信号
+    detected = cached_scan_last(item["market"], item["symbol"], interval, df, [name for name, _ in SIGNAL_GETTERS])
+    for (name, get_signal), hit in zip(SIGNAL_GETTERS, detected):
+        if not hit:
+            continue
+        signal = get_signal(df, rsi)
+        if signal is not None and signal.get("signal"):
+            # 同一根已收盘K线上的同一信号只分析、告警一次（重启、任务重叠或手动重跑时跳过）
+            signal_key = (item["symbol"], interval, name, int(df["open_time"].iloc[len(df) - 2]))
+            if await asyncio.to_thread(signal_store.seen, *signal_key):
+                logger.info(f"[DUPLICATE] {item['symbol']} {interval} {name} 已处理过，跳过")
+                return None
+            logger.info(f"[SIGNAL] {item['symbol']} {interval} 检测到{name}结构: {signal}")
+            # 本地打分未达阈值的信号不交给 LLM
+            prescore = prescorer.score(indicators, df.iloc[-2], signal)
+            if not prescore["passed"]:
+                logger.info(f"[FILTERED] {item['symbol']} {interval} {name} 本地打分 {prescore['score']} "
+                            f"未达阈值 {prescorer.threshold}: {prescore['components']}")
+                return None
+            if not await asyncio.to_thread(signal_store.claim, *signal_key):
+                logger.info(f"[DUPLICATE] {item['symbol']} {interval} {name} 正由其他任务处理，跳过")
+                return None
+            return asyncio.create_task(analyze_and_alert(item, interval, signal, df, signal_key))
+
+    logger.info(f"[NO SIGNAL] for {item['symbol']} {interval}")
+    return None
+
+
+def format_alert(item: dict, interval: str, signal: dict, llm_result: dict) -> str:
+    return (f"[{item['symbol']} {interval}] {signal.get('signal_type')} {signal.get('type')}\n"
+            f"entry: {signal.get('entry_price')}  stop: {signal.get('stop_loss')}  tp: {signal.get('take_profit')}\n"
+            f"LLM: {llm_result['llm_decision']}\n\n{llm_result['llm_raw']}")
+
+
+# 分析或发送失败、等待在之后的扫描中重试的信号：signal_key -> (item, interval, signal, df, 已重试次数)。
+# scan_frame 只检测最新一根已收盘K线，下一根收盘后原信号不会再被扫描到，因此由这里保存并重新分析
+pending_retries = {}
 
 
+async def release_for_retry(item: dict, interval: str, signal: dict, df, signal_key: tuple, attempt: int):
+    """
+    释放 claim，未超过 SIGNAL_MAX_RETRIES 时登记到 pending_retries，由下一次 scan_all_symbols 重新分析
+    """
+    await asyncio.to_thread(signal_store.release, *signal_key)
+    if attempt < SIGNAL_MAX_RETRIES:
+        pending_retries[signal_key] = (item, interval, signal, df, attempt + 1)
+        logger.info(f"[RETRY] {item['symbol']} {interval} 下次扫描重试（第 {attempt + 1}/{SIGNAL_MAX_RETRIES} 次）")
+    else:
+        logger.info(f"[ERROR] {item['symbol']} {interval} 重试 {SIGNAL_MAX_RETRIES} 次后仍失败，放弃该信号")
+
+
+async def retry_pending_signals() -> list:
+    """
+    重新 claim 并分析 pending_retries 中的信号，返回启动的分析任务；已被其他进程处理的信号跳过
+    """
+    analyses = []
+    for signal_key, (item, interval, signal, df, attempt) in list(pending_retries.items()):
+        del pending_retries[signal_key]
+        if await asyncio.to_thread(signal_store.claim, *signal_key):
+            analyses.append(asyncio.create_task(analyze_and_alert(item, interval, signal, df, signal_key, attempt)))
+    return analyses
+
+
+async def analyze_and_alert(item: dict, interval: str, signal: dict, df, signal_key: tuple, attempt: int = 0):
+    """
+    LLM 分析单个信号，完成后立即发送告警，不等待同一轮的其他分析。
+    告警由通知 worker 实际送达后才在 signal_store 中标记为已发送；分析或发送失败则释放 claim，
+    并在之后的扫描中重试（见 release_for_retry）
+    """
+    try:
+        llm_result = await asyncio.wait_for(analyze_with_llm(signal, df, item["symbol"], interval),
+                                            timeout=LLM_ANALYSIS_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.info(f"[ERROR] {item['symbol']} {interval} LLM 分析超时（{LLM_ANALYSIS_TIMEOUT}s）")
+        await release_for_retry(item, interval, signal, df, signal_key, attempt)
+        return
+    except Exception as e:
+        logger.info(f"[ERROR] {item['symbol']} {interval} LLM 分析失败: {e}")
+        await release_for_retry(item, interval, signal, df, signal_key, attempt)
+        return
+    logger.info("=== LLM 原始分析 ===")
+    logger.info(json.dumps(llm_result, indent=2, ensure_ascii=False))
+
+    async def on_done(delivered: bool):
+        if delivered:
+            await asyncio.to_thread(signal_store.mark_sent, *signal_key)
+        else:
+            logger.info(f"[ERROR] {item['symbol']} {interval} 告警发送失败")
+            await release_for_retry(item, interval, signal, df, signal_key, attempt)
+
+    await send_alert(format_alert(item, interval, signal, llm_result), on_done)
+
 
 async def scan_all_symbols():
-    for item in MONITOR_SYMBOLS:
-        if item["market"] == "binance":
+    """
+    并发扫描所有交易对：并发数由 SCAN_CONCURRENCY 限制，单个交易对超时或失败不影响其他交易对。
+    检测到的信号立即并发交给 LLM 分析（并发由各服务商的限流控制），不占用扫描名额，
+    每个分析完成后各自把告警放入通知队列（NOTIFY_COALESCE 时本轮告警合并为一条消息）；
+    之前分析或发送失败的信号在本轮一起重新分析
+    """
+    semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+
+    async def run(item: dict) -> list:
+        async with semaphore:
             try:
-                df = fetch_klines_by_market(
-                    market=item["market"],
-                    symbol=item["symbol"],
-                    interval=item["interval"],
-                    limit=120
-                )
-                rsi = calculate_rsi(df)
-                hammer_signal = get_hammer_signal(df, rsi.iloc[-2])
-                inverted_hammer_signal = get_inverted_hammer_signal(df, rsi.iloc[-2])
-                bearish_engulfing_signal = get_bearish_engulfing_signal(df, rsi.iloc[-2])
-                bullish_engulfing_signal = get_bullish_engulfing_signal(df, rsi.iloc[-2])
-
-                if hammer_signal is not None and hammer_signal["signal"]:
-                    logger.info(f"[SIGNAL] {item['symbol']} 检测到hammer结构: {hammer_signal}")
-                    llm_result = await analyze_with_llm(hammer_signal, df)
-                    logger.info("=== LLM 原始分析 ===")
-                    logger.info(json.dumps(llm_result, indent=2, ensure_ascii=False))
-
-                elif inverted_hammer_signal is not None and inverted_hammer_signal["signal"]:
-                    logger.info(f"[SIGNAL] {item['symbol']} 检测到inverted_hammer结构: {inverted_hammer_signal}")
-                    llm_result = await analyze_with_llm(inverted_hammer_signal, df)
-                    logger.info("=== LLM 原始分析 ===")
-                    logger.info(json.dumps(llm_result, indent=2, ensure_ascii=False))
-                elif bearish_engulfing_signal is not None and bearish_engulfing_signal["signal"]:
-                    logger.info(f"[SIGNAL] {item['symbol']} 检测到bearish_engulfing结构: {bearish_engulfing_signal}")
-                    llm_result = await analyze_with_llm(bearish_engulfing_signal, df)
-                    logger.info("=== LLM 原始分析 ===")
-                    logger.info(json.dumps(llm_result, indent=2, ensure_ascii=False))
-                elif bullish_engulfing_signal is not None and bullish_engulfing_signal["signal"]:
-                    logger.info(f"[SIGNAL] {item['symbol']} 检测到bullish_engulfing结构: {bullish_engulfing_signal}")
-                    llm_result = await analyze_with_llm(bullish_engulfing_signal, df)
-                    logger.info("=== LLM 原始分析 ===")
-                    logger.info(json.dumps(llm_result, indent=2, ensure_ascii=False))
-                else:
-                    logger.info(f"[NO SIGNAL] for {item['symbol']}")
+                return await asyncio.wait_for(scan_symbol(item), timeout=SCAN_SYMBOL_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.info(f"[ERROR] 扫描 {item['symbol']} 超时（{SCAN_SYMBOL_TIMEOUT}s）")
             except Exception as e:
                 logger.info(f"[ERROR] 获取 {item['symbol']} 数据失败: {e}")
+            return []
+
+    retries = await retry_pending_signals()
+    results = await asyncio.gather(*(run(item) for item in MONITOR_SYMBOLS if item["market"] == "binance"))
+    analyses = retries + [analysis for result in results for analysis in result]
+    if analyses:
+        if NOTIFY_COALESCE:
+            async with notification_dispatcher.batch():
+                await asyncio.gather(*analyses)
+        else:
+            await asyncio.gather(*analyses)
+    logger.info(f"指标缓存: {indicator_cache.stats()}，LLM 分析缓存: {llm_cache.stats()}，"
+                f"本地打分: {prescorer.stats()}，信号去重: {signal_store.stats()}")
 
 
 def start_scheduler():
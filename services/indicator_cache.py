@@ -0,0 +1,99 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from candlestick import candlestick
+from core.config import INDICATOR_CACHE_MAX_BYTES
+
+
+def _sizeof(value) -> int:
+    """
+    估算缓存值占用的内存（字节）
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes + sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class IndicatorCache:
+    """
+    指标结果 LRU 缓存，按估算的内存大小淘汰，并统计命中/未命中次数。
+    缓存值会被多个调用方共享，调用方不应修改返回的对象。
+    """
+
+    def __init__(self, max_bytes: int = INDICATOR_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        size = _sizeof(value)
+
+        with self._lock:
+            if size > self.max_bytes or key in self.entries:
+                return value
+            self.entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+indicator_cache = IndicatorCache()
+
+
+def _window_key(name: str, market: str, symbol: str, interval: str, df: pd.DataFrame, params: tuple):
+    # 已收盘窗口（去掉最后一根未收盘K线）由长度和最后一根已收盘K线的 open_time 唯一确定
+    last_open_time = int(df["open_time"].iat[-2]) if len(df) > 1 else None
+    return name, market, symbol, interval, params, len(df) - 1, last_open_time
+
+
+def cached_scan_last(market: str, symbol: str, interval: str, df: pd.DataFrame, patterns=candlestick.PATTERN_NAMES,
+                     cache: IndicatorCache = indicator_cache) -> tuple:
+    """
+    对最后一根已收盘K线（倒数第二根）执行 candlestick.scan_last，返回与 patterns 对应的布尔元组
+    """
+    key = _window_key("scan_last", market, symbol, interval, df, tuple(patterns))
+    return cache.get_or_compute(key, lambda: tuple(bool(hit) for hit in candlestick.scan_last(df, patterns, row=-2)))
@@ -1,8 +1,13 @@
+import bisect
+import operator
+from collections import deque
+
 import talib
 import pandas as pd
 import datetime
 from scipy.signal import argrelextrema
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 from candlestick import candlestick
 
@@ -11,6 +16,53 @@ def calculate_rsi(df: pd.DataFrame, period: int = 14):
     return talib.RSI(df['close'], timeperiod=period)
 
 
+def _rolling_extrema(highs, lows, length):
+    """
+    以每根K线为中心、左右各 length 根的窗口最高价/最低价（窗口在序列末尾截断），
+    返回数组下标 i 对应第 i + length 根K线
+    """
+    n = len(highs)
+    if n <= length:
+        return np.empty(0), np.empty(0)
+    padded_highs = np.concatenate([highs, np.full(length, -np.inf)])
+    padded_lows = np.concatenate([lows, np.full(length, np.inf)])
+    window = 2 * length + 1
+    return (sliding_window_view(padded_highs, window).max(axis=1),
+            sliding_window_view(padded_lows, window).min(axis=1))
+
+
+def _build_sparse_table(values, func):
+    """
+    稀疏表：table[k][i] = func(values[i: i + 2**k])
+    """
+    table = [values]
+    k = 1
+    while (1 << k) <= len(values):
+        prev = table[-1]
+        half = 1 << (k - 1)
+        table.append(func(prev[:-half], prev[half:]))
+        k += 1
+    return table
+
+
+def _find_first_breakout(table, start, end, level, above):
+    """
+    在 [start, end] 中查找第一根价格突破 level 的K线（above=True 为 > level，否则为 < level），
+    按 2 的幂跳过整段未突破的区间，O(log n)；不存在时返回 None
+    """
+    pos = start
+    for k in range(len(table) - 1, -1, -1):
+        if pos + (1 << k) - 1 <= end:
+            extreme = table[k][pos]
+            if (extreme <= level) if above else (extreme >= level):
+                pos += 1 << k
+    if pos <= end:
+        price = table[0][pos]
+        if (price > level) if above else (price < level):
+            return pos
+    return None
+
+
 def detect_123_continuation_patterns(
     klines,
     tp_mult=1.5,
@@ -22,6 +74,7 @@ def detect_123_continuation_patterns(
 ):
     """
         检测123反转形态，返回所有成功的形态
+        窗口极值预先计算，突破K线通过稀疏表查找，整体 O(n log n)
     """
     result = []
 
@@ -29,97 +82,88 @@ def detect_123_continuation_patterns(
     lows = [float(k[3]) for k in klines]
     closes = [float(k[4]) for k in klines]
     timestamps = [int(k[0]) for k in klines]
-    times = pd.to_datetime(timestamps, unit='ms')
+    last_index = len(klines) - 2
+
+    window_highs, window_lows = _rolling_extrema(np.array(highs), np.array(lows), length)
+    is_max_list = (np.array(highs[length:]) == window_highs).tolist()
+    is_min_list = (np.array(lows[length:]) == window_lows).tolist()
+
+    long_table = _build_sparse_table(np.array(closes if use_close_for_entry else highs), np.maximum)
+    short_table = _build_sparse_table(np.array(closes if use_close_for_entry else lows), np.minimum)
 
     lastHigh = 0.0
     lastLow = float("inf")
-    timeHigh = 0
-    timeLow = 0
     dir_up = False
     last_signal_index_long = -1000
     last_signal_index_short = -1000
 
     for i in range(length, len(klines) - 1):
-        h = max(highs[i - length: i + length + 1])
-        l = min(lows[i - length: i + length + 1])
-        isMax = highs[i] == h
-        isMin = lows[i] == l
+        isMax = is_max_list[i - length]
+        isMin = is_min_list[i - length]
 
         # ---- Long 逻辑 ----
         if mode in ["long", "both"]:
             if dir_up:
                 if isMin and lows[i] < lastLow:
                     lastLow = lows[i]
-                    timeLow = i
                 elif isMax and highs[i] > lastLow:
                     lastHigh = highs[i]
-                    timeHigh = i
                     dir_up = False
             else:
                 if isMax and highs[i] > lastHigh:
                     lastHigh = highs[i]
-                    timeHigh = i
                 elif isMin and lows[i] < lastHigh:
                     lastLow = lows[i]
-                    timeLow = i
                     dir_up = True
 
-                    for j in range(i + 1, len(klines) - 1):
-                        k = j
-                        price_check = closes[j] if use_close_for_entry else highs[j]
-                        if price_check > lastHigh and j - last_signal_index_long >= min_signal_distance:
-                            entry_price = lastHigh
-                            stop_loss = lastLow
-                            take_profit = entry_price + (lastHigh - lastLow) * tp_mult
-                            # dt = times[j]
-                            result.append({
-                                "type": "long",
-                                "index": k,
-                                "timestamp": timestamps[k],
-                                "entry_price": round(entry_price, 2),
-                                "stop_loss": round(stop_loss, 2),
-                                "take_profit": round(take_profit, 2)
-                            })
-                            last_signal_index_long = j
-                            break
+                    k = _find_first_breakout(long_table,
+                                             max(i + 1, last_signal_index_long + min_signal_distance),
+                                             last_index, lastHigh, above=True)
+                    if k is not None:
+                        entry_price = lastHigh
+                        stop_loss = lastLow
+                        take_profit = entry_price + (lastHigh - lastLow) * tp_mult
+                        result.append({
+                            "type": "long",
+                            "index": k,
+                            "timestamp": timestamps[k],
+                            "entry_price": round(entry_price, 2),
+                            "stop_loss": round(stop_loss, 2),
+                            "take_profit": round(take_profit, 2)
+                        })
+                        last_signal_index_long = k
 
         # ---- Short 逻辑 ----
         if mode in ["short", "both"]:
             if not dir_up:
                 if isMax and highs[i] > lastHigh:
                     lastHigh = highs[i]
-                    timeHigh = i
                 elif isMin and lows[i] < lastHigh:
                     lastLow = lows[i]
-                    timeLow = i
                     dir_up = True
             else:
                 if isMin and lows[i] < lastLow:
                     lastLow = lows[i]
-                    timeLow = i
                 elif isMax and highs[i] > lastLow:
                     lastHigh = highs[i]
-                    timeHigh = i
                     dir_up = False
 
-                    for j in range(i + 1, len(klines) - 1):
-                        k = j
-                        price_check = closes[j] if use_close_for_entry else lows[j]
-                        if price_check < lastLow and j - last_signal_index_short >= min_signal_distance:
-                            entry_price = lastLow
-                            stop_loss = lastHigh
-                            take_profit = entry_price - (stop_loss - entry_price) * tp_mult
-                            dt = times[j]
-                            result.append({
-                                "type": "short",
-                                "index": k,
-                                "timestamp": timestamps[k],
-                                "entry_price": round(entry_price, 2),
-                                "stop_loss": round(stop_loss, 2),
-                                "take_profit": round(take_profit, 2)
-                            })
-                            last_signal_index_short = j
-                            break
+                    k = _find_first_breakout(short_table,
+                                             max(i + 1, last_signal_index_short + min_signal_distance),
+                                             last_index, lastLow, above=False)
+                    if k is not None:
+                        entry_price = lastLow
+                        stop_loss = lastHigh
+                        take_profit = entry_price - (stop_loss - entry_price) * tp_mult
+                        result.append({
+                            "type": "short",
+                            "index": k,
+                            "timestamp": timestamps[k],
+                            "entry_price": round(entry_price, 2),
+                            "stop_loss": round(stop_loss, 2),
+                            "take_profit": round(take_profit, 2)
+                        })
+                        last_signal_index_short = k
 
     return result
 
@@ -151,52 +195,93 @@ def detect_three_bar_pattern(df, i):
         return "short"
     return None
 
+def three_bar_pattern_flags(df):
+    """
+    一次性计算整段序列的 detect_three_bar_pattern 结果，返回 (long, short) 两个布尔数组
+    """
+    o, h, l, c = (df[column].to_numpy(dtype=float) for column in ("open", "high", "low", "close"))
+    long_flags = np.zeros(len(df), dtype=bool)
+    short_flags = np.zeros(len(df), dtype=bool)
+    if len(df) >= 3:
+        long_flags[2:] = ((c[:-2] > o[:-2]) & (c[1:-1] < o[1:-1]) & (c[2:] > o[2:]) &
+                          (c[2:] > c[1:-1]) & (l[2:] > l[1:-1]))
+        short_flags[2:] = ((c[:-2] < o[:-2]) & (c[1:-1] > o[1:-1]) & (c[2:] < o[2:]) &
+                           (c[2:] < c[1:-1]) & (h[2:] < h[1:-1]))
+    return long_flags, short_flags
+
+
+def rolling_any(flags, lookback):
+    """
+    result[i] 表示 flags[i - lookback: i] 中是否存在 True（不含第 i 根），用前缀和实现 O(1) 查询
+    """
+    counts = np.concatenate([[0], np.cumsum(flags)])
+    idx = np.arange(len(flags))
+    return counts[idx] - counts[np.maximum(idx - lookback, 0)] > 0
+
+def rsi_filter_flags(rsi_values, long_band=(30, 50), short_band=(50, 70)):
+    """
+    detect_rsi_filter 的数组版本，返回 (long, short) 两个布尔数组；
+    long_band/short_band 为 RSI 区间（开区间），默认与 detect_rsi_filter 相同
+    """
+    rsi_values = np.asarray(rsi_values, dtype=float)
+    prev = np.concatenate([[np.nan], rsi_values[:-1]])
+    long_flags = (long_band[0] < rsi_values) & (rsi_values < long_band[1]) & (rsi_values > prev)
+    short_flags = (short_band[0] < rsi_values) & (rsi_values < short_band[1]) & (rsi_values < prev)
+    return long_flags, short_flags
+
+
+def volume_filter_flags(volumes, avg_period=20):
+    """
+    detect_volume_filter 的数组版本：当根成交量大于前 avg_period 根的均量
+    """
+    volumes = np.asarray(volumes, dtype=float)
+    flags = np.zeros(len(volumes), dtype=bool)
+    if len(volumes) > avg_period:
+        avg_volumes = sliding_window_view(volumes[:-1], avg_period).mean(axis=1)
+        flags[avg_period:] = volumes[avg_period:] > avg_volumes
+    return flags
+
+
 def check_trade_signal(df, pattern_lookback=5, volume_avg_n=20):
     """
         检测多种信号，如满足则入场开单
+        RSI、均量、Three Bar 形态先对整段序列各计算一次，再以掩码方式批量过滤所有 123 突破信号
         """
-    rsi_series = rsi(df['close'], period=14)
-    volumes = df['volume'].values
-
     # 1. 获取 123 突破信号（含入场点/止损/止盈）
-    patterns = detect_123_continuation_patterns(df)
+    patterns = detect_123_continuation_patterns(
+        df[["open_time", "open", "high", "low", "close", "volume"]].values.tolist()
+    )
+    if not patterns:
+        return []
+
+    rsi_long, rsi_short = rsi_filter_flags(rsi(df['close'], period=14))
+    long_flags, short_flags = three_bar_pattern_flags(df)
+    volume_ok = volume_filter_flags(df['volume'].values, avg_period=volume_avg_n)
+
+    idx = np.array([p["index"] for p in patterns])
+    is_long = np.array([p["type"] == "long" for p in patterns])
+
+    # ❶ pattern_lookback 区间内存在同方向 Three Bar 形态
+    three_bar_ok = np.where(is_long,
+                            rolling_any(long_flags, pattern_lookback)[idx],
+                            rolling_any(short_flags, pattern_lookback)[idx])
+    # ❷ RSI 过滤器（在突破 K 线处生效）
+    rsi_ok = np.where(is_long, rsi_long[idx], rsi_short[idx])
+    # ❸ 成交量过滤器（在突破 K 线处判断）
+    passed = three_bar_ok & rsi_ok & volume_ok[idx]
+
+    # ✅ 所有过滤器通过，保留信号
     signals = []
-
-    for p in patterns:
-        i = p['signal_index']
-        direction = p['direction']
-        entry = p['entry']
-        reasons = []
-
-        # ❶ 检查 pattern_lookback 区间内是否存在同方向 Three Bar Reversal Pattern
-        three_bar_match = False
-        for j in range(i - pattern_lookback, i):
-            if j >= 2 and detect_three_bar_pattern(df, j) == direction:
-                three_bar_match = True
-                break
-        if not three_bar_match:
-            continue
-        reasons.append("3bar-match")
-
-        # ❷ RSI 过滤器（在突破 K 线处生效）
-        if not detect_rsi_filter(rsi_series, i, direction):
-            continue
-        reasons.append("RSI-ok")
-
-        # ❸ 成交量过滤器（在突破 K 线处判断）
-        if not detect_volume_filter(volumes, i, avg_period=volume_avg_n):
-            continue
-        reasons.append("volume-high")
-
-        # ✅ 所有过滤器通过，保留信号
+    for n in np.flatnonzero(passed):
+        p = patterns[n]
         signals.append({
             "signal": True,
-            "direction": direction,
-            "entry_price": entry,
+            "direction": p["type"],
+            "entry_price": p["entry_price"],
             "stop_loss": p['stop_loss'],
             "take_profit": p['take_profit'],
-            "signal_index": i,
-            "reason": ["123-breakout"] + reasons
+            "signal_index": p["index"],
+            "reason": ["123-breakout", "3bar-match", "RSI-ok", "volume-high"]
         })
 
     return signals
@@ -209,40 +294,42 @@ def three_bar_reversal_pattern(df, direction="both"):
         多头反转：bar1收跌，bar2最低价低于bar1和bar3，bar3收盘价高于bar1和bar2的最高价
         空头反转：bar1收涨，bar2最高价高于bar1和bar3，bar3收盘价低于bar1和bar2的最低价
     """
-    signals = []
-    df = df.reset_index(drop=True)
-    for i in range(2, len(df)):
-        bar1 = df.iloc[i - 2]
-        bar2 = df.iloc[i - 1]
-        bar3 = df.iloc[i]
-
-        open1, close1, high1, low1 = bar1["open"], bar1["close"], bar1["high"], bar1["low"]
-        open2, close2, high2, low2 = bar2["open"], bar2["close"], bar2["high"], bar2["low"]
-        open3, close3, high3, low3 = bar3["open"], bar3["close"], bar3["high"], bar3["low"]
+    long_flags, short_flags = three_bar_reversal_flags(df)
+    if direction not in ("long", "both"):
+        long_flags = np.zeros_like(long_flags)
+    if direction not in ("short", "both"):
+        short_flags = np.zeros_like(short_flags)
 
-        # 多头反转条件
-        is_bullish = (
-            close1 < open1 and
-            low2 < low1 and low2 < low3 and
-            close3 > high1 and close3 > high2
-        )
+    timestamps = df["open_time"].to_numpy()
+    signals = []
+    for i in np.flatnonzero(long_flags | short_flags):
+        signals.append({"type": "long" if long_flags[i] else "short", "timestamp": int(timestamps[i])})
 
-        # 空头反转条件
-        is_bearish = (
-            close1 > open1 and
-            high2 > high1 and high2 > high3 and
-            close3 < low1 and close3 < low2
-        )
+    return signals
 
-        timestamp = int(bar3["open_time"])  # 转换为毫秒时间戳
 
-        if direction in ("long", "both") and is_bullish:
-            signals.append({"type": "long", "timestamp": timestamp})
+def three_bar_reversal_flags(df):
+    """
+    一次性计算整段序列的 Three Bar Reversal 形态，返回 (long, short) 两个布尔数组，下标为 bar3
+    """
+    o, h, l, c = (df[column].to_numpy(dtype=float) for column in ("open", "high", "low", "close"))
+    long_flags = np.zeros(len(df), dtype=bool)
+    short_flags = np.zeros(len(df), dtype=bool)
+    if len(df) >= 3:
+        open1, high1, low1, close1 = o[:-2], h[:-2], l[:-2], c[:-2]
+        high2, low2 = h[1:-1], l[1:-1]
+        high3, low3, close3 = h[2:], l[2:], c[2:]
 
-        if direction in ("short", "both") and is_bearish:
-            signals.append({"type": "short", "timestamp": timestamp})
+        # 多头反转条件
+        long_flags[2:] = ((close1 < open1) &
+                          (low2 < low1) & (low2 < low3) &
+                          (close3 > high1) & (close3 > high2))
 
-    return signals
+        # 空头反转条件
+        short_flags[2:] = ((close1 > open1) &
+                           (high2 > high1) & (high2 > high3) &
+                           (close3 < low1) & (close3 < low2))
+    return long_flags, short_flags
 
 
 
@@ -303,31 +390,25 @@ def get_hammer_signal(klines, rsi):
     检测hammer反转形态，返回最后一个成功的形态
     """
     try:
-        # 获取倒数第二根已收盘K线的时间戳
-        confirmed_ts = klines.iloc[-2]["open_time"]
         target = 'hammer'
-        patterns = candlestick.hammer(klines, target=target)
-        if patterns.empty:
-            return {"signal": False, "message": "No hammer pattern found"}
-        valid = patterns[patterns[target] == True]
-        if valid.empty:
+        # 只检测已收盘的倒数第二根K线，耗时与K线数量无关
+        if not candlestick.scan_last(klines, [target], row=-2)[0]:
             return {"signal": False, "message": "No signal in last confirmed candle"}
 
-        if valid.iloc[-1]["open_time"] == confirmed_ts:
-            entry_price = float(klines.iloc[-2]["close"])
-            stop_loss = float(klines.iloc[-2]["low"])
-            take_profit = entry_price+(entry_price-stop_loss)*2
-            return {
-                "signal": True,
-                "signal_type": target,
-                "type": "long",
-                "timestamp": datetime.datetime.now().isoformat(),
-                "entry_price": entry_price,
-                "stop_loss": stop_loss,
-                "tp_mult": 2,
-                "take_profit": take_profit,
-                "rsi": round(rsi, 2)
-            }
+        entry_price = float(klines.iloc[-2]["close"])
+        stop_loss = float(klines.iloc[-2]["low"])
+        take_profit = entry_price+(entry_price-stop_loss)*2
+        return {
+            "signal": True,
+            "signal_type": target,
+            "type": "long",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "entry_price": entry_price,
+            "stop_loss": stop_loss,
+            "tp_mult": 2,
+            "take_profit": take_profit,
+            "rsi": round(rsi, 2)
+        }
 
     except Exception as e:
         return {"error": str(e)}
@@ -340,31 +421,25 @@ def get_inverted_hammer_signal(klines,rsi):
     检测inverted_hammer反转形态，返回最后一个成功的形态
     """
     try:
-        # 获取倒数第二根已收盘K线的时间戳
-        confirmed_ts = klines.iloc[-2]["open_time"]
         target = 'inverted_hammer'
-        patterns = candlestick.inverted_hammer(klines, target=target)
-        if patterns.empty:
-            return {"signal": False, "message": "No inverted_hammer pattern found"}
-        valid = patterns[patterns[target] == True]
-        if valid.empty:
+        # 只检测已收盘的倒数第二根K线，耗时与K线数量无关
+        if not candlestick.scan_last(klines, [target], row=-2)[0]:
             return {"signal": False, "message": "No signal in last confirmed candle"}
 
-        if valid.iloc[-1]["open_time"] == confirmed_ts:
-            entry_price = float(klines.iloc[-2]["close"])
-            stop_loss = float(klines.iloc[-2]["high"])
-            take_profit = entry_price-(stop_loss-entry_price)*2
-            return {
-                "signal": True,
-                "signal_type": target,
-                "type": "short",
-                "timestamp": datetime.datetime.now().isoformat(),
-                "entry_price": entry_price,
-                "stop_loss": stop_loss,
-                "tp_mult": 2,
-                "take_profit": take_profit,
-                "rsi": round(rsi, 2)
-            }
+        entry_price = float(klines.iloc[-2]["close"])
+        stop_loss = float(klines.iloc[-2]["high"])
+        take_profit = entry_price-(stop_loss-entry_price)*2
+        return {
+            "signal": True,
+            "signal_type": target,
+            "type": "short",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "entry_price": entry_price,
+            "stop_loss": stop_loss,
+            "tp_mult": 2,
+            "take_profit": take_profit,
+            "rsi": round(rsi, 2)
+        }
 
     except Exception as e:
         return {"error": str(e)}
@@ -375,31 +450,25 @@ def get_bullish_engulfing_signal(klines,rsi):
         检测bullish_engulfing反转形态，返回最后一个成功的形态
         """
     try:
-        # 获取倒数第二根已收盘K线的时间戳
-        confirmed_ts = klines.iloc[-2]["open_time"]
         target = 'bullish_engulfing'
-        patterns = candlestick.bullish_engulfing(klines, target=target)
-        if patterns.empty:
-            return {"signal": False, "message": "No bullish_engulfing pattern found"}
-        valid = patterns[patterns[target] == True]
-        if valid.empty:
+        # 只检测已收盘的倒数第二根K线，耗时与K线数量无关
+        if not candlestick.scan_last(klines, [target], row=-2)[0]:
             return {"signal": False, "message": "No bullish_engulfing signal in last confirmed candle"}
 
-        if valid.iloc[-1]["open_time"] == confirmed_ts:
-            entry_price = float(klines.iloc[-2]["close"])
-            stop_loss = float(klines.iloc[-2]["low"])
-            take_profit = entry_price+(entry_price-stop_loss)*2
-            return {
-                "signal": True,
-                "signal_type": target,
-                "type": "long",
-                "timestamp": datetime.datetime.now().isoformat(),
-                "entry_price": entry_price,
-                "stop_loss": stop_loss,
-                "tp_mult": 2,
-                "take_profit": take_profit,
-                "rsi": round(rsi, 2)
-            }
+        entry_price = float(klines.iloc[-2]["close"])
+        stop_loss = float(klines.iloc[-2]["low"])
+        take_profit = entry_price+(entry_price-stop_loss)*2
+        return {
+            "signal": True,
+            "signal_type": target,
+            "type": "long",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "entry_price": entry_price,
+            "stop_loss": stop_loss,
+            "tp_mult": 2,
+            "take_profit": take_profit,
+            "rsi": round(rsi, 2)
+        }
 
     except Exception as e:
         return {"error": str(e)}
@@ -410,31 +479,25 @@ def get_bearish_engulfing_signal(klines,rsi):
     检测bearish_engulfing反转形态，返回最后一个成功的形态
     """
     try:
-        # 获取倒数第二根已收盘K线的时间戳
-        confirmed_ts = klines.iloc[-2]["open_time"]
         target = 'bearish_engulfing'
-        patterns = candlestick.bearish_engulfing(klines, target=target)
-        if patterns.empty:
-            return {"signal": False, "message": "No bearish_engulfing pattern found"}
-        valid = patterns[patterns[target] == True]
-        if valid.empty:
+        # 只检测已收盘的倒数第二根K线，耗时与K线数量无关
+        if not candlestick.scan_last(klines, [target], row=-2)[0]:
             return {"signal": False, "message": "No bearish_engulfing signal in last confirmed candle"}
 
-        if valid.iloc[-1]["open_time"] == confirmed_ts:
-            entry_price = float(klines.iloc[-2]["close"])
-            stop_loss = float(klines.iloc[-2]["high"])
-            take_profit = entry_price-(stop_loss-entry_price)*2
-            return {
-                "signal": True,
-                "signal_type": target,
-                "type": "short",
-                "timestamp": datetime.datetime.now().isoformat(),
-                "entry_price": entry_price,
-                "stop_loss": stop_loss,
-                "tp_mult": 2,
-                "take_profit": take_profit,
-                "rsi": round(rsi, 2)
-            }
+        entry_price = float(klines.iloc[-2]["close"])
+        stop_loss = float(klines.iloc[-2]["high"])
+        take_profit = entry_price-(stop_loss-entry_price)*2
+        return {
+            "signal": True,
+            "signal_type": target,
+            "type": "short",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "entry_price": entry_price,
+            "stop_loss": stop_loss,
+            "tp_mult": 2,
+            "take_profit": take_profit,
+            "rsi": round(rsi, 2)
+        }
 
     except Exception as e:
         return {"error": str(e)}
@@ -443,6 +506,53 @@ def get_bearish_engulfing_signal(klines,rsi):
 
 
 
+class LevelSet:
+    """
+    已聚合的支撑/阻力位集合：
+    - levels 保持加入顺序（与 find_support_resistance 返回的列表一致）
+    - sorted_levels 有序，用二分查找只比较两侧最近的价位，加入/查询均为 O(log k)
+    """
+
+    def __init__(self, threshold=0.02):
+        self.threshold = threshold
+        self.levels = []
+        self.sorted_levels = []
+
+    def __iter__(self):
+        return iter(self.levels)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def nearest(self, price, tolerance):
+        """
+        返回相对偏差小于 tolerance 的最近价位，没有则返回 None
+        """
+        pos = bisect.bisect_left(self.sorted_levels, price)
+        best = None
+        for level in self.sorted_levels[max(pos - 1, 0):pos + 1]:
+            if abs(price - level) / level < tolerance and (best is None or abs(price - level) < abs(price - best)):
+                best = level
+        return best
+
+    def add(self, level):
+        """
+        与已有价位的偏差都不小于 threshold 时作为新价位加入，返回是否加入
+        """
+        if self.nearest(level, self.threshold) is not None:
+            return False
+        bisect.insort(self.sorted_levels, level)
+        self.levels.append(level)
+        return True
+
+
+def _cluster_levels(candidates, threshold):
+    level_set = LevelSet(threshold)
+    for level in candidates:
+        level_set.add(level)
+    return level_set
+
+
 def find_support_resistance(df, order=10, threshold=0.02):
     """
     参数说明：
@@ -461,18 +571,124 @@ def find_support_resistance(df, order=10, threshold=0.02):
     support_candidates = close[local_min].astype(float)
     resistance_candidates = close[local_max].astype(float)
 
-    def cluster_levels(levels):
-        clustered = []
-        for level in levels:
-            if not any(abs(level - c) / c < threshold for c in clustered):
-                clustered.append(level)
-        return clustered
-
-    support = cluster_levels(support_candidates)
-    resistance = cluster_levels(resistance_candidates)
+    support = _cluster_levels(support_candidates, threshold).levels
+    resistance = _cluster_levels(resistance_candidates, threshold).levels
 
     return support, resistance
 
+
+class SupportResistanceTracker:
+    """
+    增量维护支撑/阻力位：新K线收盘时只检查刚好凑齐左右 order 根的那根K线是否为极值，
+    不必对整个窗口重新运行 argrelextrema。
+    support / resistance 是只含已确认极值（右侧已有 order 根K线）的 LevelSet，可直接传给 is_near_level。
+    window 为 None 时价位不会过期，levels() 的结果与对迄今全部收盘价调用 find_support_resistance 一致；
+    设置 window 后只保留最近 window 根K线内的极值，有极值过期时按原顺序重新聚合（候选通常只有几个）。
+    """
+
+    def __init__(self, order=10, threshold=0.02, window=None):
+        self.order = order
+        self.threshold = threshold
+        self.window = window
+        self.support = LevelSet(threshold)
+        self.resistance = LevelSet(threshold)
+        self.support_candidates = deque()
+        self.resistance_candidates = deque()
+        self.closes = deque(maxlen=2 * order + 1)
+        self.count = 0
+
+    def _is_extremum(self, idx, comparator):
+        # 与 argrelextrema(mode="clip") 一致：只和窗口内实际存在的K线比较
+        offset = self.count - len(self.closes)
+        value = self.closes[idx - offset]
+        start = max(idx - self.order, offset)
+        end = min(idx + self.order, self.count - 1)
+        return all(comparator(value, self.closes[j - offset]) for j in range(start, end + 1))
+
+    def _add(self, level_set, candidates, idx, value):
+        candidates.append((idx, value))
+        level_set.add(value)
+
+    def _expire(self, level_set, candidates):
+        if self.window is None or not candidates or candidates[0][0] >= self.count - self.window:
+            return level_set
+        while candidates and candidates[0][0] < self.count - self.window:
+            candidates.popleft()
+        return _cluster_levels([value for _, value in candidates], self.threshold)
+
+    def fit(self, df):
+        close = df['close'].astype(float).values
+        self.support = LevelSet(self.threshold)
+        self.resistance = LevelSet(self.threshold)
+        self.support_candidates.clear()
+        self.resistance_candidates.clear()
+        self.closes.clear()
+        self.closes.extend(close[-self.closes.maxlen:])
+        self.count = len(close)
+
+        # 右侧已凑齐 order 根的极值不会再变化
+        confirmed = self.count - self.order
+        first = 0 if self.window is None else self.count - self.window
+        for idx in argrelextrema(close, np.less_equal, order=self.order)[0]:
+            if first <= idx < confirmed:
+                self._add(self.support, self.support_candidates, int(idx), float(close[idx]))
+        for idx in argrelextrema(close, np.greater_equal, order=self.order)[0]:
+            if first <= idx < confirmed:
+                self._add(self.resistance, self.resistance_candidates, int(idx), float(close[idx]))
+        return self
+
+    def update(self, close):
+        """
+        新K线收盘，O(order + log k)
+        """
+        self.closes.append(float(close))
+        self.count += 1
+        idx = self.count - 1 - self.order
+        if idx >= 0:
+            value = self.closes[idx - (self.count - len(self.closes))]
+            if self._is_extremum(idx, operator.le):
+                self._add(self.support, self.support_candidates, idx, value)
+            if self._is_extremum(idx, operator.ge):
+                self._add(self.resistance, self.resistance_candidates, idx, value)
+        self.support = self._expire(self.support, self.support_candidates)
+        self.resistance = self._expire(self.resistance, self.resistance_candidates)
+
+    def _with_tail(self, level_set, comparator):
+        # 最后 order 根K线右侧不足 order 根，只是暂定极值，不写入 level_set
+        levels = list(level_set.levels)
+        pending = LevelSet(self.threshold)
+        offset = self.count - len(self.closes)
+        for idx in range(max(self.count - self.order, 0), self.count):
+            if self._is_extremum(idx, comparator):
+                value = self.closes[idx - offset]
+                if level_set.nearest(value, self.threshold) is None and pending.add(value):
+                    levels.append(value)
+        return levels
+
+    def levels(self):
+        """
+        返回：support_levels, resistance_levels（两个浮点数列表，含最后 order 根K线中的暂定极值）
+        """
+        return self._with_tail(self.support, operator.le), self._with_tail(self.resistance, operator.ge)
+
+    def snapshot(self) -> dict:
+        return {
+            "closes": list(self.closes),
+            "count": self.count,
+            "support": list(self.support_candidates),
+            "resistance": list(self.resistance_candidates),
+        }
+
+    def restore(self, snapshot: dict):
+        self.closes = deque(snapshot["closes"], maxlen=2 * self.order + 1)
+        self.count = snapshot["count"]
+        self.support_candidates = deque(tuple(item) for item in snapshot["support"])
+        self.resistance_candidates = deque(tuple(item) for item in snapshot["resistance"])
+        self.support = _cluster_levels([value for _, value in self.support_candidates], self.threshold)
+        self.resistance = _cluster_levels([value for _, value in self.resistance_candidates], self.threshold)
+        return self
+
+
 def is_volume_spike(df, idx, window=20, spike_ratio=1.5):
     """
     判断当前K线是否放量
@@ -489,6 +705,9 @@ def is_volume_spike(df, idx, window=20, spike_ratio=1.5):
 def is_near_level(price, levels, tolerance=0.005):
     """
     判断某价格是否接近某组支撑/阻力位
+    - levels: 价位列表，或 LevelSet（二分查找，O(log k)）
     - tolerance: 允许价格相对偏差，比如0.005代表0.5%
     """
+    if isinstance(levels, LevelSet):
+        return levels.nearest(price, tolerance) is not None
     return any(abs(price - level) / level < tolerance for level in levels)
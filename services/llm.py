@@ -0,0 +1,187 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from core.config import LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, LLM_MAX_CONNECTIONS, LLM_TIMEOUT
+from core.rate_limit import TokenBucket
+
+load_dotenv()  # 自动读取 .env 文件
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+SILICONFLOW_API_KEY = os.getenv("SILICONFLOW_API_KEY")
+USE_SILICONFLOW = os.getenv("USE_SILICONFLOW", "false").lower() == "true"
+
+SILICONFLOW_BASE_URL = "https://api.siliconflow.cn/v1/"
+SILICONFLOW_MODEL = "Qwen/Qwen2.5-72B-Instruct"  # 推荐模型（中文能力强）
+OPENAI_MODEL = "gpt-4o-mini"
+
+try:
+    # 安装 h2 后启用 HTTP/2，多个请求复用同一条连接
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProvider(abc.ABC):
+    """
+    长期存活的 LLM 服务商客户端：连接池在进程内复用，
+    并发数由信号量限制，请求速率由令牌桶限制，避免一批信号同时触发服务商限频
+    """
+    name = None
+    model = None
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_minute: int = LLM_REQUESTS_PER_MINUTE):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(requests_per_minute, period=60)
+
+    async def complete(self, messages: list, temperature: float = 0.1) -> str:
+        await self.bucket.acquire()
+        async with self.semaphore:
+            return await self._complete(messages, temperature)
+
+    async def stream(self, messages: list, temperature: float = 0.1):
+        """
+        流式返回模型输出的文本片段，整个流占用一个并发名额
+        """
+        await self.bucket.acquire()
+        async with self.semaphore:
+            async for chunk in self._stream(messages, temperature):
+                yield chunk
+
+    @abc.abstractmethod
+    async def _complete(self, messages: list, temperature: float) -> str:
+        """
+        发送一次请求并返回完整的模型输出
+        """
+
+    @abc.abstractmethod
+    def _stream(self, messages: list, temperature: float):
+        """
+        返回模型输出文本片段的异步迭代器（子类实现为 async generator）
+        """
+
+    @abc.abstractmethod
+    async def aclose(self):
+        """
+        关闭连接池
+        """
+
+
+class SiliconFlowProvider(LLMProvider):
+    name = "siliconflow"
+    model = SILICONFLOW_MODEL
+
+    def __init__(self, api_key: str, base_url: str = SILICONFLOW_BASE_URL, **kwargs):
+        super().__init__(**kwargs)
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"},
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS),
+            timeout=LLM_TIMEOUT,
+        )
+
+    def _payload(self, messages: list, temperature: float, stream: bool = False) -> dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": 1024,
+            "stream": stream,
+        }
+
+    def _check_status(self, resp: httpx.Response):
+        if resp.status_code == 429:
+            # 服务商限频时，同一服务商后续请求一起等待
+            self.bucket.pause(float(resp.headers.get("Retry-After", 10)))
+        resp.raise_for_status()
+
+    async def _complete(self, messages: list, temperature: float) -> str:
+        resp = await self.client.post("chat/completions", json=self._payload(messages, temperature))
+        self._check_status(resp)
+        return resp.json()["choices"][0]["message"]["content"]
+
+    async def _stream(self, messages: list, temperature: float):
+        # OpenAI 兼容的 SSE：每行 "data: {...}"，以 "data: [DONE]" 结束
+        async with self.client.stream("POST", "chat/completions",
+                                      json=self._payload(messages, temperature, stream=True)) as resp:
+            self._check_status(resp)
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    yield content
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+    model = OPENAI_MODEL
+
+    def __init__(self, api_key: str, **kwargs):
+        super().__init__(**kwargs)
+        # AsyncOpenAI 内部持有连接池，整个进程共用一个实例
+        self.client = AsyncOpenAI(api_key=api_key, timeout=LLM_TIMEOUT)
+
+    async def _complete(self, messages: list, temperature: float) -> str:
+        resp = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature
+        )
+        return resp.choices[0].message.content
+
+    async def _stream(self, messages: list, temperature: float):
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self):
+        await self.client.close()
+
+
+_providers = None
+
+
+def get_llm_providers() -> list:
+    """
+    按优先级返回已配置的服务商（SiliconFlow 优先，OpenAI 兜底），首次调用时创建
+    """
+    global _providers
+    if _providers is None:
+        _providers = []
+        if USE_SILICONFLOW and SILICONFLOW_API_KEY:
+            _providers.append(SiliconFlowProvider(SILICONFLOW_API_KEY))
+        if OPENAI_API_KEY:
+            _providers.append(OpenAIProvider(OPENAI_API_KEY))
+    return _providers
+
+
+async def close_llm_providers():
+    global _providers
+    if _providers is not None:
+        for provider in _providers:
+            await provider.aclose()
+        _providers = None
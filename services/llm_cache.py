@@ -0,0 +1,105 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from core.config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, LLM_CACHE_DB
+from core.sqlite import connect_sqlite
+
+
+def analysis_key(prompt: str, model: str, symbol: str = None, interval: str = None) -> str:
+    """
+    分析结果的内容地址：实际发送的 prompt（指令 + 信号 + 编码后的K线）+ 模型链 + 交易对/周期的 sha256。
+    修改指令或K线编码方式（精度、差分）后 prompt 随之变化，旧的分析结果不会再被命中。
+    调用方应对已收盘K线窗口生成 prompt：最后一根未收盘K线每次拉取都会变化，否则重复触发永远不会命中
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([symbol, interval, model]).encode("utf-8"))
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LLMAnalysisCache:
+    """
+    LLM 分析结果缓存：内存 LRU + 可选的 SQLite 磁盘层（重启后仍可命中），两层都按 TTL 过期
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL,
+                 db_path: str = LLM_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self.db = None
+
+    def _connect(self):
+        # 磁盘层在第一次使用时才打开，导入模块不会创建文件
+        if self.db is None and self.db_path:
+            self.db = connect_sqlite(self.db_path, "CREATE TABLE IF NOT EXISTS llm_cache "
+                                                   "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+        return self.db
+
+    def _remember(self, key: str, value: dict, created_at: float):
+        self.entries[key] = (value, created_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+            self.entries.pop(key, None)
+
+            db = self._connect()
+            if db is not None:
+                row = db.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] < self.ttl:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            db = self._connect()
+            if db is not None:
+                db.execute("INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                           (key, json.dumps(value, ensure_ascii=False), now))
+                db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+                db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+
+llm_cache = LLMAnalysisCache()
@@ -1,5 +1,9 @@
-def fetch_klines_by_market(market: str, symbol: str, interval: str, limit: int):
+def fetch_klines_by_market(market: str, symbol: str, interval: str, limit: int, use_store: bool = True,
+                           history: int = None):
     if market == "binance":
+        if use_store:
+            from .binance import sync_binance_klines
+            return sync_binance_klines(symbol, interval, limit, history=history)
         from .binance import fetch_binance_klines
         return fetch_binance_klines(symbol, interval, limit)
     elif market == "us":
@@ -7,3 +11,15 @@ def fetch_klines_by_market(market: str, symbol: str, interval: str, limit: int):
         return fetch_us_stock_klines(symbol, interval, limit)
     else:
         raise ValueError(f"Unsupported market: {market}")
+
+
+async def fetch_klines_by_market_async(market: str, symbol: str, interval: str, limit: int, use_store: bool = True,
+                                       history: int = None):
+    if market == "binance":
+        if use_store:
+            from .binance import sync_binance_klines_async
+            return await sync_binance_klines_async(symbol, interval, limit, history=history)
+        from .binance import fetch_binance_klines_async
+        return await fetch_binance_klines_async(symbol, interval, limit)
+    else:
+        raise ValueError(f"Unsupported market: {market}")
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import logging
+import time
+from collections import deque
+
+import httpx
+
+from core.config import BINANCE_WEIGHT_PER_MINUTE, BINANCE_KLINES_WEIGHT, BACKFILL_CONCURRENCY, BACKFILL_PREFETCH
+from core.rate_limit import TokenBucket
+from .binance import BINANCE_MAX_LIMIT, BinanceMarketClient, BinanceRateLimitError, klines_to_frame
+from .intervals import interval_to_ms
+from .kline_store import KlineStore, kline_store
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 5
+STAGING_SUFFIX = ".backfill"
+
+
+class WeightBudget(TokenBucket):
+    """
+    按 Binance 每分钟请求权重限制控制请求节奏的令牌桶，所有并发交易对共享；
+    同时参考交易所返回的已用权重，以及 429/418 响应要求的等待时间
+    """
+
+    def __init__(self, weight_per_minute: int = BINANCE_WEIGHT_PER_MINUTE):
+        super().__init__(weight_per_minute, period=60)
+
+    async def acquire(self, weight: int = BINANCE_KLINES_WEIGHT):
+        await super().acquire(weight)
+
+    def observe(self, used_weight):
+        """
+        交易所报告的本分钟已用权重（其他进程也在消耗同一 IP 的权重）
+        """
+        if used_weight is not None:
+            self._refill()
+            self.tokens = min(self.tokens, self.capacity - used_weight)
+
+
+async def _fetch_chunk(client: BinanceMarketClient, budget: WeightBudget, symbol: str, interval: str,
+                       start_time: int, end_time: int = None) -> dict:
+    for attempt in range(MAX_RETRIES):
+        await budget.acquire()
+        try:
+            arrays = await client.fetch_kline_arrays(symbol, interval, BINANCE_MAX_LIMIT,
+                                                     start_time=start_time, end_time=end_time)
+            budget.observe(client.used_weight)
+            return arrays
+        except BinanceRateLimitError as e:
+            logger.warning(f"{symbol} {interval} 触发限频（{e.status_code}），等待 {e.retry_after}s")
+            budget.pause(e.retry_after)
+        except httpx.TransportError as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            logger.warning(f"{symbol} {interval} 请求失败：{e}，重试 {attempt + 1}/{MAX_RETRIES}")
+            await asyncio.sleep(2 ** attempt)
+    raise RuntimeError(f"{symbol} {interval} 分页 {start_time} 重试 {MAX_RETRIES} 次仍失败")
+
+
+def staging_interval(interval: str) -> str:
+    """
+    回填先写入同一交易对下的暂存序列，完成后再合并到正式序列，运行中的服务读写的正式序列不受影响
+    """
+    return f"{interval}{STAGING_SUFFIX}"
+
+
+def _resume_point(store: KlineStore, market: str, symbol: str, interval: str, start_time: int):
+    """
+    返回 (写入的序列, 续传时间)：
+    - 正式序列已由之前的回填覆盖 start_time：直接从最后一根已存K线续传到正式序列（只追加，与实时同步相同）
+    - 暂存序列已覆盖 start_time（上次回填中断）：从暂存序列的最后一根K线继续
+    - 否则清空暂存序列，从 start_time 重新开始
+    续传时重新拉取最后一根K线，以刷新可能未收盘的K线
+    """
+    history_start = store.history_start(market, symbol, interval)
+    if history_start is not None and history_start <= start_time and store.count(market, symbol, interval):
+        return interval, store.last_open_time(market, symbol, interval)
+    staging = staging_interval(interval)
+    history_start = store.history_start(market, symbol, staging)
+    if history_start is not None and history_start <= start_time and store.count(market, symbol, staging):
+        return staging, store.last_open_time(market, symbol, staging)
+    store.delete(market, symbol, staging)
+    return staging, None
+
+
+def _merge_staging(store: KlineStore, market: str, symbol: str, interval: str, start_time: int):
+    """
+    把暂存序列合并到正式序列：正式序列中已有的K线（实时同步写入的较新数据）保留，暂存序列只补充更早的部分
+    """
+    staging = staging_interval(interval)
+    df = store.read(market, symbol, staging)
+    live_open_times = store.read(market, symbol, interval)["open_time"]
+    contiguous = True
+    if len(live_open_times):
+        live_first = int(live_open_times.iloc[0])
+        contiguous = int(df["open_time"].iloc[-1]) + interval_to_ms(interval) >= live_first
+        df = df[df["open_time"] < live_first]
+    if not df.empty:
+        # 与正式序列之间有缺口时不能声明从 start_time 起连续
+        store.write(market, symbol, interval, df, history_start=start_time if contiguous else None)
+    store.delete(market, symbol, staging)
+
+
+async def backfill_symbol(client: BinanceMarketClient, budget: WeightBudget, symbol: str, interval: str,
+                          start_time: int, end_time: int = None, store: KlineStore = kline_store,
+                          prefetch: int = BACKFILL_PREFETCH) -> int:
+    """
+    从 start_time（毫秒）回填到 end_time（默认当前时间），每页 1000 根，按顺序写入暂存序列，完成后合并到正式序列。
+    暂存序列的 meta.json 在每页写入后提交并记录回填起点，崩溃后再次运行会从最后一页已写入的K线继续；
+    运行中的服务只读写正式序列，回填期间不受影响。
+    返回写入的K线数量
+    """
+    step = BINANCE_MAX_LIMIT * interval_to_ms(interval)
+    end_time = end_time if end_time is not None else int(time.time() * 1000)
+    target, resume_time = _resume_point(store, "binance", symbol, interval, start_time)
+
+    # 第一页不带 endTime，交易所会从上市后的第一根K线开始返回，跳过上市前的空区间
+    arrays = await _fetch_chunk(client, budget, symbol, interval, resume_time or start_time)
+    if len(arrays["open_time"]) == 0:
+        logger.info(f"{symbol} {interval} 在 {start_time} 之后没有K线")
+        return 0
+    store.write("binance", symbol, target, klines_to_frame(arrays),
+                history_start=None if resume_time else start_time)
+    written = len(arrays["open_time"])
+    next_start = int(arrays["open_time"][-1]) + interval_to_ms(interval)
+
+    # 后续分页的时间区间可以预先算出，预取 prefetch 页并按顺序写入
+    chunk_starts = iter(range(next_start, end_time + 1, step))
+    pending = deque()
+
+    def schedule():
+        chunk_start = next(chunk_starts, None)
+        if chunk_start is not None:
+            pending.append(asyncio.create_task(
+                _fetch_chunk(client, budget, symbol, interval, chunk_start, chunk_start + step - 1)))
+
+    for _ in range(prefetch):
+        schedule()
+    try:
+        while pending:
+            arrays = await pending.popleft()
+            schedule()
+            if len(arrays["open_time"]):
+                store.write("binance", symbol, target, klines_to_frame(arrays))
+                written += len(arrays["open_time"])
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if target != interval:
+        _merge_staging(store, "binance", symbol, interval, start_time)
+
+    logger.info(f"{symbol} {interval} 回填完成，写入 {written} 根K线，本地共 "
+                f"{store.count('binance', symbol, interval)} 根")
+    return written
+
+
+async def backfill(symbols: list, interval: str, start_time: int, end_time: int = None,
+                   store: KlineStore = kline_store, client: BinanceMarketClient = None,
+                   concurrency: int = BACKFILL_CONCURRENCY, weight_per_minute: int = BINANCE_WEIGHT_PER_MINUTE) -> dict:
+    """
+    并发回填多个交易对，共享同一个权重预算；单个交易对失败不影响其他交易对，返回 {symbol: 写入数量或异常}
+    """
+    own_client = client is None
+    client = client or BinanceMarketClient()
+    budget = WeightBudget(weight_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(symbol):
+        async with semaphore:
+            return await backfill_symbol(client, budget, symbol, interval, start_time, end_time, store)
+
+    try:
+        results = await asyncio.gather(*(run(symbol) for symbol in symbols), return_exceptions=True)
+    finally:
+        if own_client:
+            await client.aclose()
+
+    for symbol, result in zip(symbols, results):
+        if isinstance(result, Exception):
+            logger.error(f"{symbol} {interval} 回填失败：{result}，重新运行会从已写入的位置继续")
+    return dict(zip(symbols, results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分页回填 Binance 历史K线到本地存储")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--days", type=int, default=365 * 5, help="回填最近多少天")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    now = int(time.time() * 1000)
+    asyncio.run(backfill(args.symbols, args.interval, now - args.days * 86400 * 1000, now,
+                         concurrency=args.concurrency))
@@ -1,22 +1,239 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
 import pandas as pd
 import requests
-from core.config import BINANCE_BASE_URL,PROXY_ADDRESS
+from core.config import BINANCE_BASE_URL, PROXY_ADDRESS, BINANCE_MAX_CONNECTIONS, BINANCE_MAX_KEEPALIVE, \
+    BINANCE_TIMEOUT
 from fastapi import HTTPException
 
+from .kline_store import KLINE_COLUMNS, KlineStore, kline_store
+
+try:
+    # 可选的更快 JSON 解析后端
+    import orjson
+except ImportError:
+    orjson = None
+
+BINANCE_MAX_LIMIT = 1000
+
+
+class BinanceRateLimitError(HTTPException):
+    """
+    Binance 返回 429（超出权重限制）或 418（被临时封禁）时抛出，retry_after 为建议等待秒数
+    """
+
+    def __init__(self, status_code: int, retry_after: float):
+        super().__init__(status_code=status_code, detail="Binance API rate limit")
+        self.retry_after = retry_after
+
+
+def loads_json(content: bytes):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode_binance_klines(raw: list, float_dtype=np.float64) -> dict:
+    """
+    把原始 klines JSON 直接解码为列数组，不经过字符串 DataFrame：
+    open_time 为 int64，open/high/low/close/volume 为 float_dtype（默认 float64，可选 float32）
+    """
+    if not raw:
+        return {column: np.empty(0, dtype=np.int64 if column == "open_time" else float_dtype)
+                for column in KLINE_COLUMNS}
+    columns = list(zip(*raw))
+    arrays = {"open_time": np.array(columns[0], dtype=np.int64)}
+    for i, column in enumerate(KLINE_COLUMNS[1:], start=1):
+        arrays[column] = np.array(columns[i], dtype=float_dtype)
+    return arrays
+
 
-def fetch_binance_klines(symbol: str, interval: str, limit: int):
+def klines_to_frame(arrays: dict) -> pd.DataFrame:
+    """
+    为仍需 DataFrame 的调用方包装列数组（不复制数据）
+    """
+    return pd.DataFrame(arrays, columns=list(KLINE_COLUMNS), copy=False)
+
+
+def _request_binance_klines(symbol: str, interval: str, limit: int, start_time: int = None,
+                            end_time: int = None) -> bytes:
     url = f"{BINANCE_BASE_URL}klines"
     params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
+    if end_time is not None:
+        params["endTime"] = end_time
     # 发送 GET 请求
     response = requests.get(url, params=params, proxies={"https": PROXY_ADDRESS})
     if response.status_code != 200:
         raise HTTPException(status_code=500, detail="Binance API Error")
-    raw = response.json()
-    df = pd.DataFrame(raw, columns=[
-        "open_time", "open", "high", "low", "close", "volume",
-        "close_time", "quote_asset_volume", "num_trades",
-        "taker_buy_base_vol", "taker_buy_quote_vol", "ignore"
-    ])
-    df = df[["open_time", "open", "high", "low", "close", "volume"]]
-    df = df.astype({"open": float, "high": float, "low": float, "close": float, "volume": float})
-    return df
\ No newline at end of file
+    return response.content
+
+
+def fetch_binance_klines(symbol: str, interval: str, limit: int, start_time: int = None, end_time: int = None):
+    return parse_binance_klines(loads_json(_request_binance_klines(symbol, interval, limit, start_time, end_time)))
+
+
+def fetch_binance_kline_arrays(symbol: str, interval: str, limit: int, start_time: int = None,
+                               end_time: int = None, float_dtype=np.float64) -> dict:
+    return decode_binance_klines(loads_json(_request_binance_klines(symbol, interval, limit, start_time, end_time)),
+                                 float_dtype=float_dtype)
+
+
+def parse_binance_klines(raw: list) -> pd.DataFrame:
+    return klines_to_frame(decode_binance_klines(raw))
+
+
+def _sync_pages(symbol: str, interval: str, limit: int, store: KlineStore, history: int = None):
+    """
+    增量同步的翻页逻辑，与请求方式无关：逐个产出 (limit, start_time, end_time) 请求参数，由调用方请求后 send 回K线，
+    同步版与异步版共用：
+    本地已有数据时，只从最后一根已存K线（可能未收盘，需要刷新）开始请求新K线；
+    本地数据不足 max(limit, history) 根时，从最早一根已存K线向前翻页补齐（本地为空时先拉取最新一页），
+    直到上市时间。
+    """
+    if store.count("binance", symbol, interval) > 0:
+        start_time = store.last_open_time("binance", symbol, interval)
+        while True:
+            df = yield BINANCE_MAX_LIMIT, start_time, None
+            store.write("binance", symbol, interval, df)
+            # 停机后的缺口按交易所单次上限翻页补齐，而不是按 limit 小步请求
+            if len(df) < BINANCE_MAX_LIMIT:
+                break
+            start_time = int(df["open_time"].iloc[-1])
+
+    needed = max(limit, history or 0)
+    while (count := store.count("binance", symbol, interval)) < needed:
+        first_open_time = store.first_open_time("binance", symbol, interval)
+        history_start = store.history_start("binance", symbol, interval)
+        if count and history_start is not None and history_start <= first_open_time:
+            # 已记录本地从上市起完整，没有更早的K线可补
+            break
+        page = min(needed - count, BINANCE_MAX_LIMIT)
+        df = yield page, None, first_open_time - 1 if count else None
+        # 返回不足一页说明已到上市时间，记录下来，之后的同步不再向前请求
+        store.write("binance", symbol, interval, df,
+                    history_start=int(df["open_time"].iloc[0]) if 0 < len(df) < page else None)
+        if len(df) < page:
+            break
+
+
+def sync_binance_klines(symbol: str, interval: str, limit: int, store: KlineStore = kline_store,
+                        history: int = None):
+    """
+    增量同步K线到本地存储并返回最近 limit 根；history 为本地至少保留的K线数（如用于聚合更大周期），
+    翻页逻辑见 _sync_pages
+    """
+    pages = _sync_pages(symbol, interval, limit, store, history)
+    try:
+        page, start_time, end_time = next(pages)
+        while True:
+            page, start_time, end_time = pages.send(
+                fetch_binance_klines(symbol, interval, page, start_time=start_time, end_time=end_time))
+    except StopIteration:
+        pass
+    return store.read("binance", symbol, interval, limit)
+
+
+class BinanceMarketClient:
+    """
+    异步 Binance 行情客户端：所有交易对共用一个连接池，经 PROXY_ADDRESS 保持长连接，
+    避免每次请求都重新进行 TCP/TLS 握手。
+    """
+
+    def __init__(self,
+                 base_url: str = BINANCE_BASE_URL,
+                 proxy: str = PROXY_ADDRESS,
+                 max_connections: int = BINANCE_MAX_CONNECTIONS,
+                 max_keepalive: int = BINANCE_MAX_KEEPALIVE,
+                 timeout: float = BINANCE_TIMEOUT):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            proxy=proxy or None,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=timeout,
+        )
+        self.used_weight = None
+
+    async def _request_klines(self, symbol: str, interval: str, limit: int, start_time: int = None,
+                              end_time: int = None) -> bytes:
+        params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        response = await self.client.get("klines", params=params)
+        # 交易所返回的本分钟已用权重，供回填时调整请求节奏
+        used_weight = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        if used_weight is not None:
+            self.used_weight = int(used_weight)
+        if response.status_code in (418, 429):
+            raise BinanceRateLimitError(response.status_code, float(response.headers.get("Retry-After", 60)))
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail="Binance API Error")
+        return response.content
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int, start_time: int = None,
+                           end_time: int = None) -> pd.DataFrame:
+        return parse_binance_klines(loads_json(await self._request_klines(symbol, interval, limit, start_time,
+                                                                          end_time)))
+
+    async def fetch_kline_arrays(self, symbol: str, interval: str, limit: int, start_time: int = None,
+                                 end_time: int = None, float_dtype=np.float64) -> dict:
+        return decode_binance_klines(loads_json(await self._request_klines(symbol, interval, limit, start_time,
+                                                                           end_time)),
+                                     float_dtype=float_dtype)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_client = None
+
+
+def get_binance_client() -> BinanceMarketClient:
+    global _client
+    if _client is None:
+        _client = BinanceMarketClient()
+    return _client
+
+
+async def close_binance_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_binance_klines_async(symbol: str, interval: str, limit: int, start_time: int = None,
+                                     end_time: int = None):
+    return await get_binance_client().fetch_klines(symbol, interval, limit, start_time=start_time, end_time=end_time)
+
+
+def _next_page(pages, df=None):
+    """
+    推进 _sync_pages 一步（写入上一页K线并返回下一页的请求参数），结束时返回 None；
+    StopIteration 不能穿过 asyncio.to_thread 的 Future，在这里转换
+    """
+    try:
+        return next(pages) if df is None else pages.send(df)
+    except StopIteration:
+        return None
+
+
+async def sync_binance_klines_async(symbol: str, interval: str, limit: int, store: KlineStore = kline_store,
+                                    history: int = None):
+    """
+    sync_binance_klines 的异步版本，使用共享连接池请求；
+    本地存储的读写（文件锁、fsync）在线程中执行，不阻塞事件循环（如回填进程持有同一序列的锁时）
+    """
+    pages = _sync_pages(symbol, interval, limit, store, history)
+    request = await asyncio.to_thread(_next_page, pages)
+    while request is not None:
+        page, start_time, end_time = request
+        df = await fetch_binance_klines_async(symbol, interval, page, start_time=start_time, end_time=end_time)
+        request = await asyncio.to_thread(_next_page, pages, df)
+    return await asyncio.to_thread(store.read, "binance", symbol, interval, limit)
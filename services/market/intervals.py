@@ -0,0 +1,17 @@
+INTERVAL_UNITS_MS = {
+    "s": 1000,
+    "m": 60 * 1000,
+    "h": 60 * 60 * 1000,
+    "d": 24 * 60 * 60 * 1000,
+    "w": 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def interval_to_ms(interval: str) -> int:
+    """
+    把 Binance 周期字符串（如 1m/15m/4h/1d/1w）换算为毫秒；月线（1M）长度不固定，不支持
+    """
+    unit = interval[-1:]
+    if unit not in INTERVAL_UNITS_MS or not interval[:-1].isdigit():
+        raise ValueError(f"Unsupported interval: {interval}")
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[unit]
@@ -0,0 +1,197 @@
+import contextlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.config import KLINE_STORE_DIR
+
+try:
+    # 多进程（如回填脚本与运行中的服务）同时读写同一目录时用文件锁互斥；不支持的平台只做进程内互斥
+    import fcntl
+except ImportError:
+    fcntl = None
+
+KLINE_COLUMNS = ("open_time", "open", "high", "low", "close", "volume")
+KLINE_DTYPES = {
+    "open_time": np.dtype(np.int64),
+    "open": np.dtype(np.float64),
+    "high": np.dtype(np.float64),
+    "low": np.dtype(np.float64),
+    "close": np.dtype(np.float64),
+    "volume": np.dtype(np.float64),
+}
+
+
+class KlineStore:
+    """
+    本地列式K线存储：每个 market/symbol/interval 一个目录，每列一个二进制文件，按 open_time 升序追加，
+    读取时通过 np.memmap 直接映射，只拷贝需要的窗口。
+    meta.json 中的行数和文件代号是唯一的提交点：
+    - 追加/刷新最后一根时原地写入，已提交的行数只增不减，中途崩溃最多留下未收盘K线的部分新值，下次同步会重写；
+    - 需要改写已提交的历史时，先把完整结果写入下一代文件，提交 meta.json 后再删除旧文件。
+    列文件比 meta.json 记录的行数短时（旧版本崩溃留下的），按最短的列读取，下次写入时修复。
+    读写都持有该目录的文件锁，其他进程（如回填脚本）的写入不会与之交错。
+    """
+
+    def __init__(self, root: str = KLINE_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _dir(self, market: str, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, market, symbol.upper(), interval)
+
+    @contextlib.contextmanager
+    def _locked(self, path: str, exclusive: bool):
+        with self._lock if exclusive else contextlib.nullcontext():
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _meta(self, market: str, symbol: str, interval: str) -> dict:
+        meta_path = os.path.join(self._dir(market, symbol, interval), "meta.json")
+        if not os.path.exists(meta_path):
+            return {"rows": 0}
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def count(self, market: str, symbol: str, interval: str) -> int:
+        return self._rows(self._dir(market, symbol, interval), self._meta(market, symbol, interval))
+
+    def history_start(self, market: str, symbol: str, interval: str):
+        """
+        本地数据从该时间（毫秒）起连续完整（由回填写入），没有记录时返回 None
+        """
+        return self._meta(market, symbol, interval).get("history_start")
+
+    @staticmethod
+    def _column_path(path: str, column: str, generation: int) -> str:
+        return os.path.join(path, f"{column}.bin" if generation == 0 else f"{column}.{generation}.bin")
+
+    def _rows(self, path: str, meta: dict) -> int:
+        """
+        可读的行数：meta.json 的行数，但不超过最短的列文件
+        """
+        rows = int(meta["rows"])
+        generation = meta.get("generation", 0)
+        for column in KLINE_COLUMNS:
+            column_path = self._column_path(path, column, generation)
+            size = os.path.getsize(column_path) if os.path.exists(column_path) else 0
+            rows = min(rows, size // KLINE_DTYPES[column].itemsize)
+        return rows
+
+    def _column(self, path: str, column: str, rows: int, generation: int = 0) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=KLINE_DTYPES[column])
+        return np.memmap(self._column_path(path, column, generation), dtype=KLINE_DTYPES[column], mode="r",
+                         shape=(rows,))
+
+    def first_open_time(self, market: str, symbol: str, interval: str):
+        path = self._dir(market, symbol, interval)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        with self._locked(path, exclusive=False):
+            meta = self._meta(market, symbol, interval)
+            open_times = self._column(path, "open_time", self._rows(path, meta), meta.get("generation", 0))
+            return int(open_times[0]) if len(open_times) else None
+
+    def last_open_time(self, market: str, symbol: str, interval: str):
+        open_times = self.read(market, symbol, interval, limit=1)["open_time"]
+        return int(open_times.iloc[-1]) if len(open_times) else None
+
+    def read(self, market: str, symbol: str, interval: str, limit: int = None) -> pd.DataFrame:
+        """
+        读取最近 limit 根K线（limit 为 None 时读取全部），列与 fetch_binance_klines 返回一致
+        """
+        path = self._dir(market, symbol, interval)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return pd.DataFrame({column: np.empty(0, dtype=KLINE_DTYPES[column]) for column in KLINE_COLUMNS})
+        with self._locked(path, exclusive=False):
+            meta = self._meta(market, symbol, interval)
+            rows = self._rows(path, meta)
+            start = 0 if limit is None else max(rows - limit, 0)
+            return pd.DataFrame({
+                column: np.array(self._column(path, column, rows, meta.get("generation", 0))[start:])
+                for column in KLINE_COLUMNS
+            })
+
+    def write(self, market: str, symbol: str, interval: str, df: pd.DataFrame, history_start: int = None):
+        """
+        写入K线：与 df 时间范围重叠的已存K线被 df 覆盖（用于刷新未收盘的最后一根），更早和更晚的K线保留。
+        history_start 表示写入后本地数据从该时间起连续完整；开头的K线被覆盖时原有记录失效
+        """
+        if df.empty:
+            return
+        df = df.sort_values("open_time")
+        path = self._dir(market, symbol, interval)
+
+        with self._locked(path, exclusive=True):
+            meta = self._meta(market, symbol, interval)
+            generation = meta.get("generation", 0)
+            rows = self._rows(path, meta)
+            open_times = self._column(path, "open_time", rows, generation)
+            keep = int(np.searchsorted(open_times, int(df["open_time"].iloc[0]), side="left"))
+            tail = int(np.searchsorted(open_times, int(df["open_time"].iloc[-1]), side="right"))
+            del open_times
+
+            if keep >= rows - 1 and tail >= rows:
+                # 追加新K线或刷新最后一根：原地写入，不截短已提交的行
+                for column in KLINE_COLUMNS:
+                    column_path = self._column_path(path, column, generation)
+                    with open(column_path, "r+b" if os.path.exists(column_path) else "wb") as f:
+                        f.seek(keep * KLINE_DTYPES[column].itemsize)
+                        f.write(df[column].to_numpy(dtype=KLINE_DTYPES[column]).tobytes())
+                        f.truncate()
+                        os.fsync(f.fileno())
+            else:
+                # 改写已提交的历史：写入下一代文件，meta.json 提交后旧文件才失效
+                new_generation = generation + 1
+                for column in KLINE_COLUMNS:
+                    existing = self._column(path, column, rows, generation)
+                    with open(self._column_path(path, column, new_generation), "wb") as f:
+                        f.write(np.ascontiguousarray(existing[:keep]).tobytes())
+                        f.write(df[column].to_numpy(dtype=KLINE_DTYPES[column]).tobytes())
+                        f.write(np.ascontiguousarray(existing[tail:]).tobytes())
+                        os.fsync(f.fileno())
+                    del existing
+                generation = new_generation
+
+            new_meta = {"rows": keep + len(df) + max(rows - tail, 0), "generation": generation}
+            if history_start is not None:
+                new_meta["history_start"] = int(history_start)
+            elif keep > 0 and "history_start" in meta:
+                new_meta["history_start"] = meta["history_start"]
+            meta_path = os.path.join(path, "meta.json")
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(new_meta, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(meta_path + ".tmp", meta_path)
+
+            if generation != meta.get("generation", 0):
+                for column in KLINE_COLUMNS:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(self._column_path(path, column, meta.get("generation", 0)))
+
+    def delete(self, market: str, symbol: str, interval: str):
+        """
+        删除整个序列（如回填用的暂存序列）
+        """
+        path = self._dir(market, symbol, interval)
+        if not os.path.exists(path):
+            return
+        with self._locked(path, exclusive=True):
+            shutil.rmtree(path)
+
+
+kline_store = KlineStore()
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from .intervals import INTERVAL_UNITS_MS, interval_to_ms
+from .kline_store import KLINE_COLUMNS, KlineStore, kline_store
+
+# Binance 周线从周一 00:00 UTC 开始，而 Unix 纪元（1970-01-01）是周四
+WEEK_OFFSET_MS = 4 * INTERVAL_UNITS_MS["d"]
+
+
+def bucket_open_times(open_times: np.ndarray, interval: str) -> np.ndarray:
+    """
+    返回每根K线所属目标周期K线的 open_time（按 UTC 对齐）
+    """
+    interval_ms = interval_to_ms(interval)
+    offset = WEEK_OFFSET_MS if interval.endswith("w") else 0
+    open_times = np.asarray(open_times, dtype=np.int64)
+    return (open_times - offset) // interval_ms * interval_ms + offset
+
+
+def resample_klines(df: pd.DataFrame, interval: str, base_interval: str = None) -> pd.DataFrame:
+    """
+    把基础周期K线（如 15m/1m）聚合为更大周期（如 1h/4h/1d），按 UTC 整点边界分组：
+    open 取第一根、close 取最后一根、high/low 取极值、volume 求和。
+    给出 base_interval 时会校验目标周期是其整数倍，并丢弃开头不完整的一组
+    （最后一组保留，与交易所返回的未收盘K线含义相同）。
+    """
+    if df.empty:
+        return pd.DataFrame({column: df[column].to_numpy()[:0] for column in KLINE_COLUMNS})
+
+    open_times = df["open_time"].to_numpy(dtype=np.int64)
+    buckets = bucket_open_times(open_times, interval)
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.concatenate([starts[1:], [len(df)]]) - 1
+
+    if base_interval is not None:
+        base_ms, target_ms = interval_to_ms(base_interval), interval_to_ms(interval)
+        if target_ms % base_ms:
+            raise ValueError(f"{interval} is not a multiple of {base_interval}")
+        if open_times[0] != buckets[0] and len(starts) > 1:
+            starts, ends = starts[1:], ends[1:]
+
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    volume = df["volume"].to_numpy(dtype=float)
+    return pd.DataFrame({
+        "open_time": buckets[starts],
+        "open": df["open"].to_numpy(dtype=float)[starts],
+        "high": np.maximum.reduceat(high, starts),
+        "low": np.minimum.reduceat(low, starts),
+        "close": df["close"].to_numpy(dtype=float)[ends],
+        "volume": np.add.reduceat(volume, starts),
+    })
+
+
+def base_bars_needed(base_interval: str, interval: str, limit: int) -> int:
+    """
+    聚合出 limit 根目标周期K线所需的基础周期K线数（多取一组，以便丢弃开头不完整的一组）
+    """
+    return (limit + 1) * (interval_to_ms(interval) // interval_to_ms(base_interval))
+
+
+def read_resampled(market: str, symbol: str, base_interval: str, interval: str, limit: int,
+                   store: KlineStore = kline_store) -> pd.DataFrame:
+    """
+    从本地存储读取足够的基础周期K线并聚合，返回最近 limit 根目标周期K线（最后一根可能未收盘），
+    不发起任何网络请求；本地基础K线不足时返回的行数会少于 limit
+    """
+    base = store.read(market, symbol, base_interval, limit=base_bars_needed(base_interval, interval, limit))
+    return resample_klines(base, interval, base_interval).iloc[-limit:].reset_index(drop=True)
@@ -1,7 +1,14 @@
+import abc
+import asyncio
+import contextlib
+import inspect
 import logging
 
+import httpx
 import requests
-from core.config import PROXY_ADDRESS
+from core.config import PROXY_ADDRESS, NOTIFY_TIMEOUT, NOTIFY_MAX_RETRIES, NOTIFY_RETRY_BACKOFF, \
+    TELEGRAM_RATE_LIMIT, DISCORD_RATE_LIMIT
+from core.rate_limit import TokenBucket
 from dotenv import load_dotenv
 import os
 load_dotenv()  # 自动读取 .env 文件
@@ -54,3 +61,232 @@ def send_discord(message: str) -> bool:
             logger.info(f"[Discord Error] {e}")
             return False
 
+
+class NotificationChannel(abc.ABC):
+    """
+    异步通知渠道：长连接池 + 令牌桶限速 + 失败重试（指数退避，429 时按服务端要求等待）
+    """
+    name = None
+    max_length = None
+
+    def __init__(self, rate_limit: tuple, proxy: str = PROXY_ADDRESS):
+        capacity, period = rate_limit
+        self.bucket = TokenBucket(capacity, period=period)
+        self.client = httpx.AsyncClient(proxy=proxy or None, timeout=NOTIFY_TIMEOUT)
+
+    @abc.abstractmethod
+    async def _post(self, message: str) -> httpx.Response:
+        """
+        发送一条消息（不超过 max_length），返回服务端响应
+        """
+
+    def _retry_after(self, resp: httpx.Response) -> float:
+        return float(resp.headers.get("Retry-After", 1))
+
+    async def send(self, message: str) -> bool:
+        for attempt in range(NOTIFY_MAX_RETRIES):
+            await self.bucket.acquire()
+            try:
+                resp = await self._post(message)
+                if resp.status_code == 429:
+                    retry_after = self._retry_after(resp)
+                    logger.info(f"[{self.name}] 触发限频，等待 {retry_after}s")
+                    self.bucket.pause(retry_after)
+                    continue
+                resp.raise_for_status()
+                logger.info(f"Send {self.name} message successful, code: {resp.status_code}")
+                return True
+            except Exception as e:
+                logger.info(f"[{self.name} Error] {e}，重试 {attempt + 1}/{NOTIFY_MAX_RETRIES}")
+                await asyncio.sleep(NOTIFY_RETRY_BACKOFF * 2 ** attempt)
+        return False
+
+    def split(self, message: str) -> list:
+        """
+        按渠道的单条消息长度上限切分，尽量在换行处断开
+        """
+        parts = []
+        while len(message) > self.max_length:
+            cut = message.rfind("\n", 0, self.max_length)
+            cut = cut if cut > 0 else self.max_length
+            parts.append(message[:cut])
+            message = message[cut:].lstrip("\n")
+        if message:
+            parts.append(message)
+        return parts
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class TelegramChannel(NotificationChannel):
+    name = "telegram"
+    max_length = 4096
+
+    def __init__(self, bot_token: str = BOT_TOKEN, chat_id: str = CHAT_ID, rate_limit: tuple = TELEGRAM_RATE_LIMIT,
+                 **kwargs):
+        super().__init__(rate_limit, **kwargs)
+        self.url = f'https://api.telegram.org/bot{bot_token}/sendMessage'
+        self.chat_id = chat_id
+
+    async def _post(self, message: str) -> httpx.Response:
+        return await self.client.post(self.url, data={'chat_id': self.chat_id, 'text': message})
+
+    def _retry_after(self, resp: httpx.Response) -> float:
+        try:
+            return float(resp.json()["parameters"]["retry_after"])
+        except Exception:
+            return super()._retry_after(resp)
+
+
+class DiscordChannel(NotificationChannel):
+    name = "discord"
+    max_length = 2000
+
+    def __init__(self, webhook_url: str = DISCORD_WEBHOOK_URL, rate_limit: tuple = DISCORD_RATE_LIMIT, **kwargs):
+        super().__init__(rate_limit, **kwargs)
+        self.url = webhook_url
+
+    async def _post(self, message: str) -> httpx.Response:
+        return await self.client.post(self.url, json={'content': message})
+
+    def _retry_after(self, resp: httpx.Response) -> float:
+        try:
+            return float(resp.json()["retry_after"])
+        except Exception:
+            return super()._retry_after(resp)
+
+
+class NotificationDispatcher:
+    """
+    通知队列：submit 只把消息放入各渠道的队列后立即返回，由后台 worker 按渠道限速发送，
+    检测流程不会因为发送通知而等待。
+    在 batch() 内提交的消息会在退出时合并为一条（每个渠道按长度上限切分）
+    """
+
+    def __init__(self, channels: list = None):
+        self._channels = channels
+        self.queues = {}
+        self.workers = []
+        self._batch = None
+
+    @property
+    def channels(self) -> list:
+        if self._channels is None:
+            self._channels = []
+            if BOT_TOKEN and CHAT_ID:
+                self._channels.append(TelegramChannel())
+            if DISCORD_WEBHOOK_URL:
+                self._channels.append(DiscordChannel())
+        return self._channels
+
+    def _ensure_workers(self):
+        if self.workers:
+            return
+        for channel in self.channels:
+            queue = self.queues[channel.name] = asyncio.Queue()
+            self.workers.append(asyncio.create_task(self._worker(channel, queue)))
+
+    async def _worker(self, channel: NotificationChannel, queue: asyncio.Queue):
+        while True:
+            message, done = await queue.get()
+            delivered = False
+            try:
+                for part in channel.split(message):
+                    if not await channel.send(part):
+                        logger.info(f"[{channel.name} Error] 重试 {NOTIFY_MAX_RETRIES} 次后仍发送失败，丢弃该消息")
+                        break
+                else:
+                    delivered = True
+            except Exception as e:
+                logger.info(f"[{channel.name} Error] {e}")
+            finally:
+                await done(delivered)
+                queue.task_done()
+
+    @staticmethod
+    def _tracker(channels: int, on_done):
+        """
+        汇总各渠道的发送结果：所有渠道都处理完后调用 on_done(是否至少一个渠道发送成功)，
+        on_done 可以是协程函数（如需在线程中访问数据库）
+        """
+        state = {"pending": channels, "delivered": False}
+
+        async def done(delivered: bool):
+            state["pending"] -= 1
+            state["delivered"] |= delivered
+            if state["pending"] == 0 and on_done is not None:
+                try:
+                    result = on_done(state["delivered"])
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.info(f"[Notify Error] 发送结果回调失败: {e}")
+
+        return done
+
+    async def submit(self, message: str, on_done=None):
+        """
+        on_done(delivered) 在消息由各渠道处理完后调用；至少一个渠道发送成功即视为已送达，
+        没有配置任何渠道时直接视为已送达
+        """
+        if self._batch is not None:
+            self._batch.append((message, on_done))
+            return
+        self._ensure_workers()
+        if not self.queues:
+            await self._tracker(1, on_done)(True)
+            return
+        done = self._tracker(len(self.queues), on_done)
+        for queue in self.queues.values():
+            queue.put_nowait((message, done))
+
+    @contextlib.asynccontextmanager
+    async def batch(self):
+        self._batch = []
+        try:
+            yield self
+        finally:
+            messages, self._batch = self._batch, None
+            if messages:
+                callbacks = [self._tracker(1, on_done) for _, on_done in messages if on_done is not None]
+
+                async def on_done(delivered: bool):
+                    await asyncio.gather(*(done(delivered) for done in callbacks))
+
+                await self.submit("\n\n----------\n\n".join(message for message, _ in messages), on_done)
+
+    async def aclose(self, timeout: float = NOTIFY_TIMEOUT):
+        """
+        等待队列中的消息发送完（最多 timeout 秒），然后关闭 worker 和连接池
+        """
+        if self.queues:
+            try:
+                await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self.queues.values())), timeout)
+            except asyncio.TimeoutError:
+                logger.info("关闭时仍有未发送的通知")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        for queue in self.queues.values():
+            while not queue.empty():
+                _, done = queue.get_nowait()
+                await done(False)
+        for channel in self._channels or ():
+            await channel.aclose()
+        self.workers, self.queues, self._channels = [], {}, None
+
+
+notification_dispatcher = NotificationDispatcher()
+
+
+async def send_alert(message: str, on_done=None):
+    """
+    把告警放入通知队列后立即返回，由后台 worker 发送到已配置的渠道（Telegram / Discord）；
+    发送完成后调用 on_done(delivered)
+    """
+    await notification_dispatcher.submit(message, on_done)
+
+
+async def close_notifier():
+    await notification_dispatcher.aclose()
@@ -0,0 +1,78 @@
+import threading
+
+from core.config import PRESCORE_THRESHOLD, PRESCORE_WEIGHTS, PRESCORE_LEVEL_TOLERANCE, PRESCORE_SLOPE_THRESHOLD, \
+    PRESCORE_RSI_BANDS
+from services.indicators import is_near_level
+from services.streaming_indicators import SymbolIndicators
+
+
+class PreScorer:
+    """
+    LLM 之前的本地打分：对最后一根已收盘K线上的信号，按以下几项加权求和，得分达到 threshold 才交给 LLM
+    - level：多头信号的 low/close 接近支撑位，空头信号的 high/close 接近阻力位
+      （只用右侧已有 order 根K线确认的极值，信号K线自身不会成为价位）
+    - trend：EMA 斜率与信号方向一致加分，明显相反扣分
+    - rsi：RSI 落在该方向的合理区间
+    - volume：信号K线放量
+    各项都读取 SymbolIndicators 中已增量更新的状态，不重新计算整个窗口。
+    默认权重下只接近价位不足以放行，还需要趋势、RSI 或放量中至少一项配合
+    """
+
+    def __init__(self, threshold: float = PRESCORE_THRESHOLD, weights: dict = None):
+        self.threshold = threshold
+        self.weights = weights or PRESCORE_WEIGHTS
+        self.evaluated = 0
+        self.passed = 0
+        self._lock = threading.Lock()
+
+    def components(self, indicators: SymbolIndicators, candle, signal: dict) -> dict:
+        """
+        candle 为信号所在的已收盘K线，indicators 需已同步到该K线
+        """
+        direction = 1 if signal.get("type") == "long" else -1
+
+        if direction > 0:
+            levels, prices = indicators.levels.support, (candle["low"], candle["close"])
+        else:
+            levels, prices = indicators.levels.resistance, (candle["high"], candle["close"])
+        near_level = any(is_near_level(price, levels, PRESCORE_LEVEL_TOLERANCE) for price in prices)
+
+        slope = indicators.ema.slope() or 0.0
+        if direction * slope > PRESCORE_SLOPE_THRESHOLD:
+            trend = 1
+        elif direction * slope < -PRESCORE_SLOPE_THRESHOLD:
+            trend = -1
+        else:
+            trend = 0
+
+        rsi = indicators.rsi.value
+        low, high = PRESCORE_RSI_BANDS["long" if direction > 0 else "short"]
+        return {
+            "level": int(near_level),
+            "trend": trend,
+            "rsi": int(rsi is not None and low <= rsi <= high),
+            "volume": int(indicators.volume.is_spike()),
+        }
+
+    def score(self, indicators: SymbolIndicators, candle, signal: dict) -> dict:
+        """
+        返回 {"score", "passed", "components"}，并累计放行/拦截次数
+        """
+        components = self.components(indicators, candle, signal)
+        score = sum(self.weights.get(name, 0) * value for name, value in components.items())
+        passed = score >= self.threshold
+        with self._lock:
+            self.evaluated += 1
+            self.passed += int(passed)
+        return {"score": score, "passed": passed, "components": components}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "evaluated": self.evaluated,
+                "passed": self.passed,
+                "avoided_llm_calls": self.evaluated - self.passed,
+            }
+
+
+prescorer = PreScorer()
@@ -0,0 +1,89 @@
+import datetime
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+from core.config import PROMPT_PRICE_PRECISION
+
+try:
+    # 可选：安装 tiktoken 时用真实分词器统计 token 数
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _encoding = None
+
+# 没有 tiktoken 时的近似：数字按每 3 位一个 token，单词、单个符号、单个汉字各算一个
+_TOKEN_PATTERN = re.compile(r"\d{1,3}|[A-Za-z]+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def price_precision(symbol: str, prices) -> int:
+    """
+    价格保留的小数位：优先使用 PROMPT_PRICE_PRECISION 中的配置，否则按价格量级保留约 5 位有效数字
+    """
+    if symbol and symbol.upper() in PROMPT_PRICE_PRECISION:
+        return PROMPT_PRICE_PRECISION[symbol.upper()]
+    reference = float(np.nanmedian(np.abs(prices))) if len(prices) else 0.0
+    if reference <= 0:
+        return 2
+    return max(0, 4 - int(math.floor(math.log10(reference))))
+
+
+def _format_column(values: np.ndarray, decimals: int) -> list:
+    return [f"{value:.{decimals}f}" for value in np.round(values, decimals)]
+
+
+def encode_klines(df: pd.DataFrame, symbol: str = None, delta: bool = False) -> dict:
+    """
+    把K线窗口编码为紧凑 CSV，供 LLM prompt 使用：
+    - t 为相对第一根K线的序号（第一根的 UTC 时间和周期写在说明里），不再输出毫秒时间戳
+    - 价格按交易对精度取整，成交量按量级取整
+    - delta=True 时 open/high/low/close 写成相对上一根收盘价的差值（第一根为原值）
+    返回 {"header": 列说明, "text": CSV, "tokens": 编码后 token 数,
+          "baseline_tokens": 原始精度完整 CSV 的 token 数, "saved_tokens": 节省的 token 数}
+    （DataFrame 的 repr 超过 60 行时只显示首尾各 5 行，不能作为完整窗口的基准）
+    """
+    open_times = df["open_time"].to_numpy(dtype=np.int64)
+    prices = {column: df[column].to_numpy(dtype=float) for column in ("open", "high", "low", "close")}
+    volume = df["volume"].to_numpy(dtype=float)
+
+    step = int(np.median(np.diff(open_times))) if len(open_times) > 1 else 0
+    offsets = (open_times - open_times[0]) // step if step else np.zeros(len(open_times), dtype=np.int64)
+    decimals = price_precision(symbol, prices["close"])
+    volume_decimals = 0 if len(volume) and np.nanmedian(volume) >= 100 else 2
+
+    if delta:
+        previous_close = np.concatenate([[0.0], prices["close"][:-1]])
+        prices = {column: values - previous_close for column, values in prices.items()}
+
+    columns = [
+        [str(offset) for offset in offsets],
+        *(_format_column(prices[column], decimals) for column in ("open", "high", "low", "close")),
+        _format_column(volume, volume_decimals),
+    ]
+    text = "\n".join(",".join(row) for row in zip(*columns))
+
+    header = "列：t,open,high,low,close,volume"
+    if len(open_times):
+        start = datetime.datetime.fromtimestamp(open_times[0] / 1000, tz=datetime.timezone.utc)
+        header += (f"；t 为相对第一根K线的序号，第一根 open_time={start:%Y-%m-%d %H:%M} UTC，"
+                   f"周期 {step // 60000} 分钟")
+    if delta:
+        header += "；除第一根外，open/high/low/close 为相对上一根收盘价的差值"
+
+    tokens = estimate_tokens(header + "\n" + text)
+    baseline_tokens = estimate_tokens(df[["open_time", "open", "high", "low", "close", "volume"]].to_csv(index=False))
+    return {
+        "header": header,
+        "text": text,
+        "tokens": tokens,
+        "baseline_tokens": baseline_tokens,
+        "saved_tokens": baseline_tokens - tokens,
+    }
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+
+from core.config import SIGNAL_STORE_DB, SIGNAL_STORE_MAX_ENTRIES, SIGNAL_STORE_RETENTION, SIGNAL_CLAIM_TTL
+from core.sqlite import connect_sqlite
+
+CLAIMED = "claimed"
+SENT = "sent"
+
+
+class SignalStore:
+    """
+    信号去重记录：以 (symbol, interval, pattern, 已收盘K线 open_time) 为键。
+    分析前先 claim（同一信号只有一个任务能拿到），告警发出后 mark_sent，分析失败则 release 以便下次重试；
+    claim 超过 claim_ttl 秒仍未完成（如进程中途退出）视为失效，可被重新 claim。
+    已发送的键缓存在内存 LRU 中，常见的“已处理”判断不访问数据库；SQLite 使用 WAL，多个进程可同时使用
+    """
+
+    def __init__(self, db_path: str = SIGNAL_STORE_DB, max_entries: int = SIGNAL_STORE_MAX_ENTRIES,
+                 retention: float = SIGNAL_STORE_RETENTION, claim_ttl: float = SIGNAL_CLAIM_TTL):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.retention = retention
+        self.claim_ttl = claim_ttl
+        self.entries = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.claims = 0
+        self._lock = threading.Lock()
+        self.db = None
+
+    def _connect(self):
+        # 第一次使用时才打开，导入模块不会创建文件
+        if self.db is None and self.db_path:
+            self.db = connect_sqlite(self.db_path,
+                                     "CREATE TABLE IF NOT EXISTS signals "
+                                     "(symbol TEXT NOT NULL, interval TEXT NOT NULL, pattern TEXT NOT NULL, "
+                                     "open_time INTEGER NOT NULL, status TEXT NOT NULL, updated_at REAL NOT NULL, "
+                                     "PRIMARY KEY (symbol, interval, pattern, open_time))",
+                                     timeout=10)
+        return self.db
+
+    def _remember(self, key: tuple, status: str):
+        self.entries[key] = status
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def seen(self, symbol: str, interval: str, pattern: str, open_time: int) -> bool:
+        """
+        该信号是否已发送告警或正由其他任务处理
+        """
+        key = (symbol, interval, pattern, int(open_time))
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return True
+            db = self._connect()
+            if db is None:
+                return False
+            row = db.execute("SELECT status, updated_at FROM signals "
+                             "WHERE symbol = ? AND interval = ? AND pattern = ? AND open_time = ?", key).fetchone()
+            if row is None or (row[0] == CLAIMED and time.time() - row[1] >= self.claim_ttl):
+                return False
+            if row[0] == SENT:
+                self._remember(key, SENT)
+            self.disk_hits += 1
+            return True
+
+    def claim(self, symbol: str, interval: str, pattern: str, open_time: int) -> bool:
+        """
+        登记开始处理该信号，返回 False 表示已发送过或正由其他任务（包括其他进程）处理
+        """
+        key = (symbol, interval, pattern, int(open_time))
+        now = time.time()
+        with self._lock:
+            if key in self.entries:
+                self.memory_hits += 1
+                return False
+            db = self._connect()
+            if db is not None:
+                # 插入与“接管失效 claim”都是单条语句，多个进程并发时只有一个能成功
+                cursor = db.execute("INSERT INTO signals (symbol, interval, pattern, open_time, status, updated_at) "
+                                    "VALUES (?, ?, ?, ?, ?, ?) "
+                                    "ON CONFLICT (symbol, interval, pattern, open_time) DO UPDATE "
+                                    "SET status = excluded.status, updated_at = excluded.updated_at "
+                                    "WHERE signals.status = ? AND signals.updated_at < ?",
+                                    (*key, CLAIMED, now, CLAIMED, now - self.claim_ttl))
+                db.execute("DELETE FROM signals WHERE open_time < ?", (int((now - self.retention) * 1000),))
+                db.commit()
+                if cursor.rowcount != 1:
+                    self.disk_hits += 1
+                    return False
+            self._remember(key, CLAIMED)
+            self.claims += 1
+            return True
+
+    def mark_sent(self, symbol: str, interval: str, pattern: str, open_time: int):
+        key = (symbol, interval, pattern, int(open_time))
+        with self._lock:
+            self._remember(key, SENT)
+            db = self._connect()
+            if db is not None:
+                db.execute("UPDATE signals SET status = ?, updated_at = ? "
+                           "WHERE symbol = ? AND interval = ? AND pattern = ? AND open_time = ?",
+                           (SENT, time.time(), *key))
+                db.commit()
+
+    def release(self, symbol: str, interval: str, pattern: str, open_time: int):
+        """
+        放弃 claim（如 LLM 分析失败），该信号在下一次扫描时可重新处理
+        """
+        key = (symbol, interval, pattern, int(open_time))
+        with self._lock:
+            self.entries.pop(key, None)
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM signals WHERE symbol = ? AND interval = ? AND pattern = ? "
+                           "AND open_time = ? AND status = ?", (*key, CLAIMED))
+                db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "claims": self.claims,
+            }
+
+    def close(self):
+        with self._lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+
+signal_store = SignalStore()
@@ -0,0 +1,282 @@
+import math
+from collections import deque
+
+import pandas as pd
+
+from core.config import PRESCORE_EMA_PERIOD, PRESCORE_SLOPE_BARS
+from services.indicators import SupportResistanceTracker
+
+
+class RSIState:
+    """
+    Wilder RSI：前 period 个涨跌幅取简单平均作为种子，之后按 (prev * (period - 1) + x) / period 平滑，
+    计算顺序与 talib.RSI 相同，每根K线 O(1)
+    """
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.count = 0
+        self.value = None
+
+    def update(self, close: float):
+        close = float(close)
+        if self.prev_close is None:
+            self.prev_close = close
+            return self.value
+
+        delta = close - self.prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.prev_close = close
+        self.count += 1
+
+        if self.count < self.period:
+            self.avg_gain += gain
+            self.avg_loss += loss
+            return self.value
+        if self.count == self.period:
+            self.avg_gain = (self.avg_gain + gain) / self.period
+            self.avg_loss = (self.avg_loss + loss) / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        total = self.avg_gain + self.avg_loss
+        self.value = 100 * self.avg_gain / total if total != 0 else 0.0
+        return self.value
+
+    def snapshot(self) -> dict:
+        return dict(self.__dict__)
+
+    def restore(self, snapshot: dict):
+        self.__dict__.update(snapshot)
+        return self
+
+
+class EMAState:
+    """
+    EMA：以前 period 个值的简单平均作为种子（与 talib.EMA 一致）；
+    history > 0 时保留最近 history + 1 个 EMA 值（未形成时为 None），用于计算斜率
+    """
+
+    def __init__(self, period: int = 20, history: int = 0):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.seed_sum = 0.0
+        self.count = 0
+        self.value = None
+        self.history = deque(maxlen=history + 1)
+
+    def update(self, price: float):
+        price = float(price)
+        self.count += 1
+        if self.count < self.period:
+            self.seed_sum += price
+        elif self.count == self.period:
+            self.value = (self.seed_sum + price) / self.period
+        else:
+            self.value = (price - self.value) * self.alpha + self.value
+        self.history.append(self.value)
+        return self.value
+
+    def slope(self):
+        """
+        最近 history 根K线的 EMA 相对变化，历史不足时返回 None
+        """
+        if len(self.history) < self.history.maxlen or self.history[0] is None:
+            return None
+        return (self.history[-1] - self.history[0]) / self.history[0]
+
+    def snapshot(self) -> dict:
+        snapshot = dict(self.__dict__)
+        snapshot["history"] = list(self.history)
+        snapshot["history_size"] = self.history.maxlen
+        return snapshot
+
+    def restore(self, snapshot: dict):
+        snapshot = dict(snapshot)
+        self.history = deque(snapshot.pop("history"), maxlen=snapshot.pop("history_size"))
+        self.__dict__.update(snapshot)
+        return self
+
+
+class ATRState:
+    """
+    ATR：真实波幅的 Wilder 平滑，种子为前 period 个真实波幅的简单平均（与 talib.ATR 一致）
+    """
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.seed_sum = 0.0
+        self.count = 0
+        self.value = None
+
+    def update(self, high: float, low: float, close: float):
+        high, low, close = float(high), float(low), float(close)
+        if self.prev_close is None:
+            self.prev_close = close
+            return self.value
+
+        true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+
+        if self.count < self.period:
+            self.seed_sum += true_range
+        elif self.count == self.period:
+            self.value = (self.seed_sum + true_range) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+    def snapshot(self) -> dict:
+        return dict(self.__dict__)
+
+    def restore(self, snapshot: dict):
+        self.__dict__.update(snapshot)
+        return self
+
+
+class RollingStatsState:
+    """
+    固定窗口的滚动均值/标准差（总体标准差），用于成交量，维护窗口内的和与平方和；
+    额外保留窗口之前的一个值，用于和不含最新值的前一窗口比较（放量判断）
+    """
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self.values = deque(maxlen=window + 1)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, value: float):
+        value = float(value)
+        if len(self.values) >= self.window:
+            dropped = self.values[-self.window]
+            self.total -= dropped
+            self.total_sq -= dropped * dropped
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+        return self.mean
+
+    @property
+    def mean(self):
+        if len(self.values) < self.window:
+            return None
+        return self.total / self.window
+
+    @property
+    def std(self):
+        if len(self.values) < self.window:
+            return None
+        variance = self.total_sq / self.window - (self.total / self.window) ** 2
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def previous_mean(self):
+        """
+        最新值之前 window 个值的均值
+        """
+        if len(self.values) <= self.window:
+            return None
+        return (self.total - self.values[-1] + self.values[0]) / self.window
+
+    def is_spike(self, spike_ratio: float = 1.5) -> bool:
+        """
+        最新值是否超过前 window 个值均值的 spike_ratio 倍（与 is_volume_spike 一致）
+        """
+        previous_mean = self.previous_mean
+        return previous_mean is not None and self.values[-1] > spike_ratio * previous_mean
+
+    def snapshot(self) -> dict:
+        return {"window": self.window, "values": list(self.values), "total": self.total, "total_sq": self.total_sq}
+
+    def restore(self, snapshot: dict):
+        self.window = snapshot["window"]
+        self.values = deque(snapshot["values"], maxlen=self.window + 1)
+        self.total = snapshot["total"]
+        self.total_sq = snapshot["total_sq"]
+        return self
+
+
+class SymbolIndicators:
+    """
+    单个 market/symbol/interval 的指标状态，按 open_time 只吸收新的已收盘K线；
+    levels 为增量维护的支撑/阻力位（最近 level_window 根K线内已确认的极值）
+    """
+
+    def __init__(self, rsi_period: int = 14, ema_period: int = 20, atr_period: int = 14, volume_window: int = 20,
+                 level_order: int = 10, level_threshold: float = 0.02, level_window: int = 120, ema_history: int = 0):
+        self.params = dict(rsi_period=rsi_period, ema_period=ema_period, atr_period=atr_period,
+                           volume_window=volume_window, level_order=level_order, level_threshold=level_threshold,
+                           level_window=level_window, ema_history=ema_history)
+        self.rsi = RSIState(rsi_period)
+        self.ema = EMAState(ema_period, history=ema_history)
+        self.atr = ATRState(atr_period)
+        self.volume = RollingStatsState(volume_window)
+        self.levels = SupportResistanceTracker(level_order, level_threshold, window=level_window)
+        self.last_open_time = None
+
+    def update(self, candle):
+        """
+        吸收一根已收盘K线（含 open_time/high/low/close/volume 的 dict 或 Series）
+        """
+        self.rsi.update(candle["close"])
+        self.ema.update(candle["close"])
+        self.atr.update(candle["high"], candle["low"], candle["close"])
+        self.volume.update(candle["volume"])
+        self.levels.update(candle["close"])
+        self.last_open_time = int(candle["open_time"])
+
+    def sync(self, df: pd.DataFrame, closed_only: bool = True):
+        """
+        用K线窗口推进状态：默认忽略最后一根未收盘K线，只处理 open_time 更新的K线。
+        窗口与已吸收的K线之间有缺口时，从窗口开头重新计算。
+        """
+        closed = df.iloc[:-1] if closed_only else df
+        if closed.empty:
+            return self
+        open_times = closed["open_time"].to_numpy()
+        if self.last_open_time is None or open_times[0] > self.last_open_time:
+            self.__init__(**self.params)
+            start = 0
+        else:
+            start = int((open_times <= self.last_open_time).sum())
+        for candle in closed.iloc[start:][["open_time", "high", "low", "close", "volume"]].to_dict("records"):
+            self.update(candle)
+        return self
+
+    def snapshot(self) -> dict:
+        return {
+            "rsi": self.rsi.snapshot(),
+            "ema": self.ema.snapshot(),
+            "atr": self.atr.snapshot(),
+            "volume": self.volume.snapshot(),
+            "levels": self.levels.snapshot(),
+            "last_open_time": self.last_open_time,
+        }
+
+    def restore(self, snapshot: dict):
+        self.rsi.restore(snapshot["rsi"])
+        self.ema.restore(snapshot["ema"])
+        self.atr.restore(snapshot["atr"])
+        self.volume.restore(snapshot["volume"])
+        self.levels.restore(snapshot["levels"])
+        self.last_open_time = snapshot["last_open_time"]
+        return self
+
+
+_states = {}
+
+
+def get_symbol_indicators(market: str, symbol: str, interval: str) -> SymbolIndicators:
+    key = (market, symbol, interval)
+    if key not in _states:
+        # EMA 与斜率跨度按本地打分的配置，打分直接读取这里的状态
+        _states[key] = SymbolIndicators(ema_period=PRESCORE_EMA_PERIOD, ema_history=PRESCORE_SLOPE_BARS)
+    return _states[key]
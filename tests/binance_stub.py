@@ -0,0 +1,92 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+class StubBinanceServer:
+    """
+    本地替身 Binance 行情服务，只实现 GET /api/v3/klines（startTime/endTime/limit 语义与交易所一致），
+    用于在不访问外网的情况下测试回填与同步：
+    - open_times 为该交易对全部K线的 open_time，价格由 open_time 确定，便于校验
+    - failures 为按请求顺序注入的故障：429（限频）、"drop"（不返回响应直接断开连接）、500
+    - fail_after 为 N 时，第 N 个请求之后全部返回 500，用于模拟回填中途崩溃
+    """
+
+    def __init__(self, open_times, failures=(), fail_after=None):
+        self.open_times = np.asarray(open_times, dtype=np.int64)
+        self.failures = list(failures)
+        self.fail_after = fail_after
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/api/v3/"
+
+    @staticmethod
+    def kline(open_time: int) -> list:
+        price = 100 + open_time / 60000 % 1000 / 10
+        return [int(open_time), f"{price:.2f}", f"{price + 1:.2f}", f"{price - 1:.2f}", f"{price + 0.5:.2f}", "10.0",
+                int(open_time) + 59999, "0", 1, "0", "0", "0"]
+
+    def klines(self, params: dict) -> list:
+        limit = int(params.get("limit", 500))
+        open_times = self.open_times
+        if "endTime" in params:
+            open_times = open_times[open_times <= int(params["endTime"])]
+        if "startTime" in params:
+            open_times = open_times[open_times >= int(params["startTime"])][:limit]
+        else:
+            open_times = open_times[-limit:]
+        return [self.kline(open_time) for open_time in open_times]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: bytes, headers: dict = None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append(params)
+                    count = len(stub.requests)
+                    failure = stub.failures.pop(0) if stub.failures else None
+                if url.path != "/api/v3/klines":
+                    return self._reply(404, b"{}")
+                if stub.fail_after is not None and count > stub.fail_after:
+                    return self._reply(500, b'{"code": -1000}')
+                if failure == 429:
+                    return self._reply(429, b'{"code": -1003}', {"Retry-After": "0"})
+                if failure == "drop":
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                if failure == 500:
+                    return self._reply(500, b'{"code": -1000}')
+                self._reply(200, json.dumps(stub.klines(params)).encode(), {"X-MBX-USED-WEIGHT-1M": str(count)})
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
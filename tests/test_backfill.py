@@ -0,0 +1,76 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from binance_stub import StubBinanceServer
+from services.market.backfill import backfill, staging_interval
+from services.market.binance import BinanceMarketClient, parse_binance_klines
+from services.market.kline_store import KlineStore
+
+MINUTE = 60_000
+LISTING = 1_600_000_020 * 1000 // MINUTE * MINUTE
+BARS = 5_500
+OPEN_TIMES = LISTING + np.arange(BARS, dtype=np.int64) * MINUTE
+START = LISTING - 30 * MINUTE  # 早于上市时间：第一页应直接从上市后的第一根开始
+END = int(OPEN_TIMES[-1])
+
+
+def run_backfill(server: StubBinanceServer, store: KlineStore) -> dict:
+    async def run():
+        client = BinanceMarketClient(base_url=server.base_url, proxy=None)
+        try:
+            return await backfill(["BTCUSDT"], "1m", START, END, store=store, client=client)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def expected_closes(open_times) -> np.ndarray:
+    return np.array([float(StubBinanceServer.kline(t)[4]) for t in open_times])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KlineStore(str(tmp_path / "klines"))
+
+
+def test_backfill_retries_rate_limits_and_dropped_connections(store):
+    with StubBinanceServer(OPEN_TIMES, failures=[None, 429, "drop"]) as server:
+        result = run_backfill(server, store)
+
+    assert result == {"BTCUSDT": BARS}
+    df = store.read("binance", "BTCUSDT", "1m")
+    np.testing.assert_array_equal(df["open_time"].to_numpy(), OPEN_TIMES)
+    np.testing.assert_allclose(df["close"].to_numpy(), expected_closes(OPEN_TIMES))
+    assert store.history_start("binance", "BTCUSDT", "1m") == START
+    assert store.count("binance", "BTCUSDT", staging_interval("1m")) == 0
+
+
+def test_backfill_resumes_after_crash_without_touching_live_series(store):
+    # 运行中的服务已同步了最近 120 根
+    live = OPEN_TIMES[-120:]
+    with StubBinanceServer(OPEN_TIMES) as server:
+        store.write("binance", "BTCUSDT", "1m", parse_binance_klines(server.klines({"limit": 120})))
+
+    # 第 3 个请求之后交易所一直出错：回填中断，已写入的分页留在暂存序列
+    with StubBinanceServer(OPEN_TIMES, fail_after=3) as server:
+        result = run_backfill(server, store)
+    assert isinstance(result["BTCUSDT"], Exception)
+    staged = store.read("binance", "BTCUSDT", staging_interval("1m"))
+    assert 0 < len(staged) < BARS
+    np.testing.assert_array_equal(store.read("binance", "BTCUSDT", "1m")["open_time"].to_numpy(), live)
+
+    # 重新运行：从暂存序列的最后一根继续，而不是从头开始
+    with StubBinanceServer(OPEN_TIMES) as server:
+        result = run_backfill(server, store)
+        first_request = server.requests[0]
+    assert int(first_request["startTime"]) == int(staged["open_time"].iloc[-1])
+    assert result["BTCUSDT"] == BARS - len(staged) + 1
+
+    df = store.read("binance", "BTCUSDT", "1m")
+    np.testing.assert_array_equal(df["open_time"].to_numpy(), OPEN_TIMES)
+    np.testing.assert_allclose(df["close"].to_numpy(), expected_closes(OPEN_TIMES))
+    assert store.history_start("binance", "BTCUSDT", "1m") == START
+    assert store.count("binance", "BTCUSDT", staging_interval("1m")) == 0
+
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from candlestick import candlestick
+
+OHLC = ['open', 'high', 'low', 'close']
+
+
+def has_pattern_by_rows(cndl, candles_df, ohlc, is_reversed):
+    """
+    原先逐行调用 logic() 的实现，作为向量化 has_pattern 的参照
+    """
+    cndl.prepare_data(candles_df, ohlc)
+    results = []
+    rows_len = len(candles_df)
+    idxs = candles_df.index.values
+
+    if is_reversed:
+        cndl.multi_coeff = 1
+        for row_idx in range(rows_len - 1, -1, -1):
+            if row_idx <= rows_len - cndl.required_count:
+                results.append([idxs[row_idx], cndl.logic(row_idx)])
+            else:
+                results.append([idxs[row_idx], None])
+    else:
+        cndl.multi_coeff = -1
+        for row in range(0, rows_len, 1):
+            if row >= cndl.required_count - 1:
+                results.append([idxs[row], cndl.logic(row)])
+            else:
+                results.append([idxs[row], None])
+
+    return candles_df.join(pd.DataFrame(results, columns=['row', cndl.target]).set_index('row'), how='outer')
+
+
+# 随机数据中极少出现的三K线十字星形态，按正向和反向顺序各放一组（open, high, low, close）
+STAR_DOJIS = [
+    [(100, 105.5, 99.8, 105), (106, 107, 105, 106), (104, 104.2, 98.8, 99)],  # evening_star_doji
+    [(105, 105.2, 99.5, 100), (99, 100, 98, 99), (101, 106.2, 100.8, 106)],  # morning_star_doji
+]
+
+
+def random_candles(rng, n):
+    # 价格取整到 0.1 并让部分K线开收相等或没有上/下影线，覆盖十字星和并列的高低点
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    opens = np.concatenate([closes[:1], closes[:-1]]) * (1 + rng.normal(0, 0.005, n))
+    opens = np.where(rng.random(n) < 0.1, closes, opens)
+    highs = np.maximum(opens, closes) * (1 + rng.exponential(0.004, n) * (rng.random(n) > 0.3))
+    lows = np.minimum(opens, closes) * (1 - rng.exponential(0.004, n) * (rng.random(n) > 0.3))
+    candles = pd.DataFrame({column: np.round(values, 1)
+                            for column, values in zip(OHLC, (opens, highs, lows, closes))})
+    stars = [candle for triple in STAR_DOJIS for candle in triple + triple[::-1]]
+    return pd.concat([pd.DataFrame(stars, columns=OHLC, dtype=float), candles], ignore_index=True)
+
+
+def as_objects(values):
+    return [None if value is None or value is np.nan else bool(value) for value in values]
+
+
+@pytest.mark.parametrize("is_reversed", [False, True])
+@pytest.mark.parametrize("pattern_name", candlestick.PATTERN_NAMES)
+def test_has_pattern_matches_row_loop(pattern_name, is_reversed):
+    rng = np.random.default_rng(candlestick.PATTERN_NAMES.index(pattern_name))
+    candles_df = random_candles(rng, 5000)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = has_pattern_by_rows(candlestick.create_pattern(pattern_name, target=pattern_name), candles_df,
+                                       OHLC, is_reversed)
+    actual = candlestick.create_pattern(pattern_name, target=pattern_name).has_pattern(candles_df, OHLC, is_reversed)
+
+    assert as_objects(actual[pattern_name]) == as_objects(expected[pattern_name])
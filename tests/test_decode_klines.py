@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from binance_stub import StubBinanceServer
+from services.market import binance
+from services.market.binance import decode_binance_klines, fetch_binance_kline_arrays, parse_binance_klines
+
+OPEN_TIMES = 1_700_000_000_000 + np.arange(50, dtype=np.int64) * 60_000
+RAW = json.loads(json.dumps([StubBinanceServer.kline(t) for t in OPEN_TIMES]))
+
+
+def reference_frame(raw: list) -> pd.DataFrame:
+    """
+    原先的解析方式：整张字符串 DataFrame 再 astype(float)
+    """
+    df = pd.DataFrame(raw, columns=[
+        "open_time", "open", "high", "low", "close", "volume",
+        "close_time", "quote_asset_volume", "num_trades",
+        "taker_buy_base_vol", "taker_buy_quote_vol", "ignore"
+    ])
+    df = df[["open_time", "open", "high", "low", "close", "volume"]]
+    return df.astype({"open": float, "high": float, "low": float, "close": float, "volume": float})
+
+
+def test_parse_matches_astype_frame():
+    df = parse_binance_klines(RAW)
+    assert df["open_time"].dtype == np.int64
+    pd.testing.assert_frame_equal(df, reference_frame(RAW), check_dtype=False)
+    assert (df.dtypes.drop("open_time") == np.float64).all()
+
+
+def test_decode_float32():
+    arrays = decode_binance_klines(RAW, float_dtype=np.float32)
+    assert arrays["open_time"].dtype == np.int64
+    np.testing.assert_array_equal(arrays["open_time"], OPEN_TIMES)
+    expected = reference_frame(RAW)
+    for column in ("open", "high", "low", "close", "volume"):
+        assert arrays[column].dtype == np.float32
+        np.testing.assert_array_equal(arrays[column], expected[column].to_numpy(dtype=np.float32))
+
+
+def test_decode_empty():
+    arrays = decode_binance_klines([], float_dtype=np.float32)
+    assert arrays["open_time"].dtype == np.int64 and len(arrays["open_time"]) == 0
+    assert arrays["close"].dtype == np.float32
+
+
+@pytest.mark.parametrize("start_time, end_time", [(None, None), (int(OPEN_TIMES[10]), None),
+                                                  (None, int(OPEN_TIMES[20])),
+                                                  (int(OPEN_TIMES[10]), int(OPEN_TIMES[20]))])
+def test_fetch_kline_arrays_passes_time_range(monkeypatch, start_time, end_time):
+    with StubBinanceServer(OPEN_TIMES) as server:
+        monkeypatch.setattr(binance, "BINANCE_BASE_URL", server.base_url)
+        arrays = fetch_binance_kline_arrays("BTCUSDT", "1m", 5, start_time=start_time, end_time=end_time)
+    expected = server.klines({key: value for key, value in (("limit", 5), ("startTime", start_time),
+                                                            ("endTime", end_time)) if value is not None})
+    np.testing.assert_array_equal(arrays["open_time"], [kline[0] for kline in expected])
+    assert server.requests[0].get("endTime") == (None if end_time is None else str(end_time))
@@ -0,0 +1,157 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.indicators import detect_123_continuation_patterns
+
+
+def reference_detect_123_continuation_patterns(
+    klines,
+    tp_mult=1.5,
+    length=5,
+    use_close_for_entry=True,
+    show_plot=True,
+    min_signal_distance=5,
+    mode="both"  # 可选: "long", "short", "both"
+):
+    """
+        改写前的实现（逐根向后扫描突破K线，O(n²)），作为对照
+    """
+    result = []
+
+    highs = [float(k[2]) for k in klines]
+    lows = [float(k[3]) for k in klines]
+    closes = [float(k[4]) for k in klines]
+    timestamps = [int(k[0]) for k in klines]
+    times = pd.to_datetime(timestamps, unit='ms')
+
+    lastHigh = 0.0
+    lastLow = float("inf")
+    timeHigh = 0
+    timeLow = 0
+    dir_up = False
+    last_signal_index_long = -1000
+    last_signal_index_short = -1000
+
+    for i in range(length, len(klines) - 1):
+        h = max(highs[i - length: i + length + 1])
+        l = min(lows[i - length: i + length + 1])
+        isMax = highs[i] == h
+        isMin = lows[i] == l
+
+        # ---- Long 逻辑 ----
+        if mode in ["long", "both"]:
+            if dir_up:
+                if isMin and lows[i] < lastLow:
+                    lastLow = lows[i]
+                    timeLow = i
+                elif isMax and highs[i] > lastLow:
+                    lastHigh = highs[i]
+                    timeHigh = i
+                    dir_up = False
+            else:
+                if isMax and highs[i] > lastHigh:
+                    lastHigh = highs[i]
+                    timeHigh = i
+                elif isMin and lows[i] < lastHigh:
+                    lastLow = lows[i]
+                    timeLow = i
+                    dir_up = True
+
+                    for j in range(i + 1, len(klines) - 1):
+                        k = j
+                        price_check = closes[j] if use_close_for_entry else highs[j]
+                        if price_check > lastHigh and j - last_signal_index_long >= min_signal_distance:
+                            entry_price = lastHigh
+                            stop_loss = lastLow
+                            take_profit = entry_price + (lastHigh - lastLow) * tp_mult
+                            # dt = times[j]
+                            result.append({
+                                "type": "long",
+                                "index": k,
+                                "timestamp": timestamps[k],
+                                "entry_price": round(entry_price, 2),
+                                "stop_loss": round(stop_loss, 2),
+                                "take_profit": round(take_profit, 2)
+                            })
+                            last_signal_index_long = j
+                            break
+
+        # ---- Short 逻辑 ----
+        if mode in ["short", "both"]:
+            if not dir_up:
+                if isMax and highs[i] > lastHigh:
+                    lastHigh = highs[i]
+                    timeHigh = i
+                elif isMin and lows[i] < lastHigh:
+                    lastLow = lows[i]
+                    timeLow = i
+                    dir_up = True
+            else:
+                if isMin and lows[i] < lastLow:
+                    lastLow = lows[i]
+                    timeLow = i
+                elif isMax and highs[i] > lastLow:
+                    lastHigh = highs[i]
+                    timeHigh = i
+                    dir_up = False
+
+                    for j in range(i + 1, len(klines) - 1):
+                        k = j
+                        price_check = closes[j] if use_close_for_entry else lows[j]
+                        if price_check < lastLow and j - last_signal_index_short >= min_signal_distance:
+                            entry_price = lastLow
+                            stop_loss = lastHigh
+                            take_profit = entry_price - (stop_loss - entry_price) * tp_mult
+                            dt = times[j]
+                            result.append({
+                                "type": "short",
+                                "index": k,
+                                "timestamp": timestamps[k],
+                                "entry_price": round(entry_price, 2),
+                                "stop_loss": round(stop_loss, 2),
+                                "take_profit": round(take_profit, 2)
+                            })
+                            last_signal_index_short = j
+                            break
+
+    return result
+
+
+def random_klines(rng, n, rounded):
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    opens = np.concatenate([closes[:1], closes[:-1]])
+    highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.005, n))
+    lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.005, n))
+    if rounded:
+        # 取整后会出现大量相等的高低点，覆盖窗口极值并列的情况
+        opens, highs, lows, closes = (np.round(values, 1) for values in (opens, highs, lows, closes))
+    open_times = 1_700_000_000_000 + np.arange(n) * 900_000
+    volumes = rng.uniform(1, 100, n)
+    return [[int(t), o, h, l, c, v] for t, o, h, l, c, v in zip(open_times, opens, highs, lows, closes, volumes)]
+
+
+CASES = list(itertools.product(["long", "short", "both"], [True, False], [True, False]))
+
+
+@pytest.mark.parametrize("seed, mode, use_close_for_entry, rounded",
+                         [(seed, *case) for seed, case in enumerate(CASES)])
+def test_matches_reference_implementation(seed, mode, use_close_for_entry, rounded):
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        klines = random_klines(rng, int(rng.integers(20, 600)), rounded)
+        params = dict(tp_mult=float(rng.choice([1.0, 1.5, 2.0])),
+                      length=int(rng.integers(2, 8)),
+                      use_close_for_entry=use_close_for_entry,
+                      min_signal_distance=int(rng.integers(1, 12)),
+                      mode=mode)
+        assert detect_123_continuation_patterns(klines, **params) == \
+            reference_detect_123_continuation_patterns(klines, **params)
+
+
+@pytest.mark.parametrize("n", [0, 1, 5, 6])
+def test_short_series(n):
+    klines = random_klines(np.random.default_rng(n), n, rounded=False)
+    assert detect_123_continuation_patterns(klines) == reference_detect_123_continuation_patterns(klines)
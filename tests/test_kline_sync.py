@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from binance_stub import StubBinanceServer
+from services.market import binance
+from services.market.binance import BinanceMarketClient, parse_binance_klines, sync_binance_klines_async
+from services.market.kline_store import KlineStore
+
+MINUTE = 60_000
+OPEN_TIMES = 1_600_000_000_000 + np.arange(300, dtype=np.int64) * MINUTE
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KlineStore(str(tmp_path / "klines"))
+
+
+def test_held_store_lock_does_not_block_event_loop(store, monkeypatch):
+    # 模拟回填进程持有同一序列的排他锁：同步应在线程中等待锁，其他协程照常运行
+    store.write("binance", "BTCUSDT", "1m",
+                parse_binance_klines([StubBinanceServer.kline(t) for t in OPEN_TIMES[:200]]))
+    locked, unlock = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with store._locked(store._dir("binance", "BTCUSDT", "1m"), exclusive=True):
+            locked.set()
+            unlock.wait(5)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    locked.wait(5)
+
+    async def run():
+        with StubBinanceServer(OPEN_TIMES) as server:
+            client = BinanceMarketClient(base_url=server.base_url, proxy=None)
+            monkeypatch.setattr(binance, "get_binance_client", lambda: client)
+            try:
+                sync = asyncio.create_task(sync_binance_klines_async("BTCUSDT", "1m", 120, store=store))
+                ticks = 0
+                for _ in range(10):
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+                assert not sync.done()
+                unlock.set()
+                df = await asyncio.wait_for(sync, 5)
+            finally:
+                await client.aclose()
+        return ticks, df
+
+    try:
+        ticks, df = asyncio.run(run())
+    finally:
+        unlock.set()
+        holder.join()
+    assert ticks == 10
+    assert len(df) == 120
+    assert int(df["open_time"].iloc[-1]) == OPEN_TIMES[-1]
+    assert store.count("binance", "BTCUSDT", "1m") == len(OPEN_TIMES)
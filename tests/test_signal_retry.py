@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from scheduler import task_runner
+from services.notifier import NotificationDispatcher
+from services.signal_store import SignalStore
+
+
+class RecordingChannel:
+    name = "recording"
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.sent = []
+
+    def split(self, message):
+        return [message]
+
+    async def send(self, message):
+        self.sent.append(message)
+        return self.results.pop(0)
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    store = SignalStore(str(tmp_path / "signals.sqlite3"))
+    monkeypatch.setattr(task_runner, "signal_store", store)
+    monkeypatch.setattr(task_runner, "pending_retries", {})
+    yield task_runner, store
+    store.close()
+
+
+def run_with_dispatcher(channel, monkeypatch, coroutine):
+    async def run():
+        dispatcher = NotificationDispatcher([channel])
+        monkeypatch.setattr("services.notifier.notification_dispatcher", dispatcher)
+        try:
+            return await coroutine()
+        finally:
+            await dispatcher.aclose()
+    return asyncio.run(run())
+
+
+def test_failed_analysis_and_delivery_are_retried_on_later_scans(runner, monkeypatch):
+    runner, store = runner
+    item = {"symbol": "BTCUSDT", "market": "binance"}
+    signal = {"signal": True, "type": "long", "signal_type": "hammer"}
+    signal_key = ("BTCUSDT", "15m", "hammer", int(time.time() * 1000))
+    outcomes = [RuntimeError("LLM unavailable"), {"llm_raw": "ok", "llm_decision": "recommend"}]
+
+    async def analyze_with_llm(*args):
+        # 成功后的重复分析在真实环境中由 llm_cache 命中
+        outcome = outcomes.pop(0) if len(outcomes) > 1 else outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(runner, "analyze_with_llm", analyze_with_llm)
+    # 第一次发送失败，第二次成功
+    channel = RecordingChannel([False, True])
+
+    async def scans():
+        assert store.claim(*signal_key)
+        await runner.analyze_and_alert(item, "15m", signal, None, signal_key)
+        assert signal_key in runner.pending_retries
+        assert not store.seen(*signal_key)
+
+        # 下一轮扫描：分析成功但发送失败，再次登记重试
+        await asyncio.gather(*await runner.retry_pending_signals())
+        await asyncio.sleep(0.05)
+        assert runner.pending_retries[signal_key][-1] == 2
+        assert not store.seen(*signal_key)
+
+        # 再下一轮：发送成功后才标记为已发送
+        await asyncio.gather(*await runner.retry_pending_signals())
+        await asyncio.sleep(0.05)
+        return store.seen(*signal_key)
+
+    assert run_with_dispatcher(channel, monkeypatch, scans)
+    assert runner.pending_retries == {}
+    assert len(channel.sent) == 2
+
+
+def test_retries_stop_after_max_attempts(runner, monkeypatch):
+    runner, store = runner
+    item = {"symbol": "BTCUSDT", "market": "binance"}
+    signal_key = ("BTCUSDT", "15m", "hammer", int(time.time() * 1000))
+
+    async def analyze_with_llm(*args):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(runner, "analyze_with_llm", analyze_with_llm)
+
+    async def scans():
+        assert store.claim(*signal_key)
+        await runner.analyze_and_alert(item, "15m", {}, None, signal_key)
+        attempts = 1
+        while runner.pending_retries:
+            await asyncio.gather(*await runner.retry_pending_signals())
+            attempts += 1
+        return attempts
+
+    assert run_with_dispatcher(RecordingChannel([]), monkeypatch, scans) == runner.SIGNAL_MAX_RETRIES + 1
+    assert not store.seen(*signal_key)